@@ -0,0 +1,307 @@
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+import serial
+
+from protocol import BAUDRATE, TIMEOUT, SweepProgress, parse_record, record_to_point, reconnect
+
+# the GUI process runs Tk, Open3D and pool threads; start children fresh instead of forking it
+MP_CONTEXT = mp.get_context("spawn")
+
+POINT_DTYPE = np.dtype([
+    ("t_read", "<f8"),  # time.monotonic() when the line left the serial port
+    ("phi", "<i4"),
+    ("theta", "<i4"),
+    ("r", "<f4"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("z", "<f4"),
+])
+
+# header slots (uint64): total records written, lines rejected by the parser
+_HDR_WRITTEN = 0
+_HDR_REJECTED = 1
+_HDR_SIZE = 8 * 8
+
+TIMINGS_INTERVAL = 0.5  # seconds between "timings" messages to the parent
+
+
+class PointRing:
+    """Single-producer / single-consumer ring of POINT_DTYPE records in shared memory.
+
+    The producer never blocks and never waits for the reader: it writes the
+    record, then publishes it by bumping the written counter. The reader keeps
+    its own cursor, so falling more than `capacity` records behind shows up as
+    overruns instead of stalling acquisition.
+    """
+
+    def __init__(self, shm, capacity, owner):
+        self.shm = shm
+        self.capacity = capacity
+        self.owner = owner
+        self.header = np.ndarray((_HDR_SIZE // 8,), dtype="<u8", buffer=shm.buf)
+        self.records = np.ndarray((capacity,), dtype=POINT_DTYPE, buffer=shm.buf, offset=_HDR_SIZE)
+
+        self.read_pos = int(self.header[_HDR_WRITTEN])
+        self.received = 0
+        self.overruns = 0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self.latency_sum = 0.0
+
+    @classmethod
+    def create(cls, capacity=1 << 16):
+        size = _HDR_SIZE + capacity * POINT_DTYPE.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(shm, capacity, owner=True)
+        ring.header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, capacity):
+        # the segment is registered with the resource tracker shared with the
+        # creating process, so attaching from a child does not change who unlinks it
+        return cls(shared_memory.SharedMemory(name=name), capacity, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # producer side
+
+    def push(self, t_read, phi, theta, r, x, y, z):
+        written = int(self.header[_HDR_WRITTEN])
+        self.records[written % self.capacity] = (t_read, phi, theta, r, x, y, z)
+        self.header[_HDR_WRITTEN] = written + 1
+
+    def reject(self):
+        self.header[_HDR_REJECTED] += 1
+
+    # consumer side
+
+    def read(self):
+        """Return a copy of the records published since the last call.
+
+        Seqlock-style: the records are copied out first, then the written
+        counter is read again. Records the producer may have overwritten during
+        the copy are dropped and counted as overruns.
+        """
+        written = int(self.header[_HDR_WRITTEN])
+        start = self.read_pos
+        if written - start > self.capacity:
+            self.overruns += written - start - self.capacity
+            start = written - self.capacity
+        if start == written:
+            return self.records[:0].copy()
+
+        begin = start % self.capacity
+        end = begin + (written - start)
+        if end <= self.capacity:
+            records = self.records[begin:end].copy()
+        else:
+            records = np.concatenate((self.records[begin:], self.records[:end - self.capacity]))
+
+        # the producer writes record n into the slot of n - capacity before
+        # publishing n, so everything up to that one is suspect
+        lapped = int(self.header[_HDR_WRITTEN]) + 1 - self.capacity - start
+        if lapped > 0:
+            lapped = min(lapped, len(records))
+            self.overruns += lapped
+            records = records[lapped:]
+
+        self.read_pos = written
+        self._account(records)
+        return records
+
+    def _account(self, records):
+        if not len(records):
+            return
+        latency = time.monotonic() - records["t_read"]
+        self.received += len(records)
+        self.latency_last = float(latency[-1])
+        self.latency_max = max(self.latency_max, float(latency.max()))
+        self.latency_sum += float(latency.sum())
+
+    def stats(self):
+        return {
+            "written": int(self.header[_HDR_WRITTEN]),
+            "received": self.received,
+            "overruns": self.overruns,
+            "rejected": int(self.header[_HDR_REJECTED]),
+            "latency_last_ms": self.latency_last * 1000.0,
+            "latency_avg_ms": self.latency_sum / self.received * 1000.0 if self.received else 0.0,
+            "latency_max_ms": self.latency_max * 1000.0,
+        }
+
+    def close(self):
+        # drop our views before releasing the mapping
+        self.header = None
+        self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def acquisition_main(port, parameters, progress, ring_name, capacity, log_queue, stop_event):
+    """Body of the acquisition process: serial read, parse, convert, publish.
+
+    `progress` is the SweepProgress to continue (None for a new sweep); the
+    updated copy is sent back in the final "progress" message. Stage timings
+    and parser counters go to the parent in periodic "timings" messages.
+    """
+    def put(type_, payload=None):
+        log_queue.put((type_, payload))
+
+    def new_batch():
+        return {"serial_read": [], "parse": [], "corrupted": 0, "garbage": 0, "sent": time.monotonic()}
+
+    def flush_timings():
+        nonlocal batch
+        if batch["serial_read"] or batch["corrupted"] or batch["garbage"]:
+            del batch["sent"]
+            put("timings", batch)
+        batch = new_batch()
+
+    batch = new_batch()
+
+    def send_sweep():
+        sweep_cmd = progress.resume_command()
+        ser.write(sweep_cmd.encode())
+        put("log", f"> {sweep_cmd.strip()}")
+
+    ring = PointRing.attach(ring_name, capacity)
+    if progress is None:
+        progress = SweepProgress(parameters)
+    ser = None
+    # whatever happens, the parent must hear "stopped" or it will never start again
+    try:
+        try:
+            ser = serial.Serial(port, BAUDRATE, timeout=TIMEOUT)
+        except serial.SerialException as err:
+            put("log", f"Error opening serial port: {err}")
+            return
+
+        put("log", f"Connected to {port} at {BAUDRATE} baud (acquisition process).")
+        time.sleep(2)
+
+        try:
+            send_sweep()
+        except serial.SerialException:
+            put("log", "Failed to send sweep command.")
+            return
+
+        while not stop_event.is_set():
+            try:
+                t0 = time.perf_counter()
+                raw = ser.readline()
+                t1 = time.perf_counter()
+                t_read = time.monotonic()
+                if t_read - batch["sent"] >= TIMINGS_INTERVAL:
+                    flush_timings()
+                line = raw.decode(errors="ignore").strip()
+                if not line:
+                    continue
+                batch["serial_read"].append(t1 - t0)
+
+                parts = line.split()
+                try:
+                    record = parse_record(parts)
+                except ValueError:
+                    ring.reject()
+                    batch["corrupted"] += 1
+                    put("log", f"Corrupted packet data: {line}")
+                    continue
+
+                if record is None:
+                    batch["garbage"] += 1
+                    put("log", f"Garbage ignored: {line}")
+                    continue
+
+                phi_int, theta_int, r = record
+                if not progress.accept(phi_int, theta_int):
+                    continue
+                x, y, z = record_to_point(phi_int, theta_int, r)
+                ring.push(t_read, phi_int, theta_int, r, x, y, z)
+                batch["parse"].append(time.perf_counter() - t1)
+
+            except (serial.SerialException, TypeError, OSError) as e:
+                if stop_event.is_set():
+                    break
+                put("log", f"Serial connection lost: {e}")
+                if progress.complete:
+                    break
+
+                try:
+                    ser.close()
+                except serial.SerialException:
+                    pass
+                ser = None
+                while ser is None:
+                    ser = reconnect(port, stop_event.is_set, lambda msg: put("log", msg))
+                    if ser is None:
+                        break
+                    put("log", f"Reconnected to {port}, resuming sweep at index {progress.next_index}.")
+                    time.sleep(2)
+                    try:
+                        send_sweep()
+                    except serial.SerialException as err:
+                        put("log", f"Failed to resume sweep: {err}")
+                        ser = None
+                if ser is None:
+                    break
+            except Exception as e:
+                put("log", f"Unexpected error: {e}")
+    finally:
+        if ser is not None:
+            try:
+                ser.close()
+            except serial.SerialException:
+                pass
+        ring.close()
+
+        flush_timings()
+        put("log", "Acquisition process stopped.")
+        put("progress", progress)
+        put("stopped")
+
+
+class AcquisitionProcess:
+    """Process-based drop-in for SerialReader.
+
+    Points are published through a PointRing owned by this object; logs and
+    the final "stopped" message go through `queue`, which must be a
+    MP_CONTEXT.Queue().
+    """
+
+    def __init__(self, port, parameters, queue, progress=None, capacity=1 << 16):
+        self.port = port
+        self.parameters = parameters
+        self.queue = queue
+        self.ring = PointRing.create(capacity)
+        self.stop_event = MP_CONTEXT.Event()
+        self.process = MP_CONTEXT.Process(
+            target=acquisition_main,
+            args=(port, parameters, progress, self.ring.name, capacity, queue, self.stop_event),
+            daemon=True,
+        )
+
+    def start(self):
+        self.process.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        self.process.join(timeout)
+
+    def stats(self):
+        return self.ring.stats()
+
+    def close(self):
+        self.stop()
+        self.join(TIMEOUT + 1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+
+import numpy as np
+
+ARCHIVE_VERSION = 1
+INDEX_FILE = "index.json"
+CHUNK_ROWS = 1 << 16
+
+# column name -> on-disk dtype; rows are stored in acquisition order
+COLUMNS = {
+    "t": "<f8",      # wall-clock time of the sample
+    "phi": "<i4",    # raw stepper positions as reported by the device
+    "theta": "<i4",
+    "r": "<f4",
+    "x": "<f4",
+    "y": "<f4",
+    "z": "<f4",
+}
+
+
+class SessionArchive:
+    """A directory holding many sweeps as columnar .npy arrays plus a JSON index.
+
+    Layout::
+
+        session/
+          index.json          sweep metadata and per-chunk bounding boxes
+          sweep_0000/x.npy    one file per column, loaded with mmap
+          ...
+
+    Each sweep is cut into chunks of CHUNK_ROWS consecutive rows. The index
+    keeps a bounding box per chunk, so a spatial query only touches the
+    pages of the chunks it overlaps.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.index = json.load(f)
+            if self.index.get("version") != ARCHIVE_VERSION:
+                raise ValueError(f"Unsupported archive version: {self.index.get('version')}")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.index = {"version": ARCHIVE_VERSION, "sweeps": []}
+            self._save_index()
+
+    def _save_index(self):
+        tmp = os.path.join(self.path, INDEX_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, INDEX_FILE))
+
+    def _sweep_dir(self, sweep_id):
+        return os.path.join(self.path, f"sweep_{sweep_id:04d}")
+
+    def sweeps(self):
+        return list(self.index["sweeps"])
+
+    def sweep(self, sweep_id):
+        for meta in self.index["sweeps"]:
+            if meta["id"] == sweep_id:
+                return meta
+        raise KeyError(f"No sweep {sweep_id} in {self.path}")
+
+    def append(self, columns, parameters=None, device=None, start_time=None, **extra):
+        """Store one sweep; `columns` maps every name in COLUMNS to an equal-length array."""
+        missing = set(COLUMNS) - set(columns)
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+
+        arrays = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+        count = len(arrays["x"])
+        if any(len(a) != count for a in arrays.values()):
+            raise ValueError("Columns differ in length")
+
+        sweep_id = max((meta["id"] for meta in self.index["sweeps"]), default=-1) + 1
+        sweep_dir = self._sweep_dir(sweep_id)
+        os.makedirs(sweep_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(sweep_dir, f"{name}.npy"), array)
+
+        xyz = np.column_stack((arrays["x"], arrays["y"], arrays["z"]))
+        chunks = []
+        for offset in range(0, count, CHUNK_ROWS):
+            block = xyz[offset:offset + CHUNK_ROWS]
+            chunks.append({
+                "offset": offset,
+                "count": len(block),
+                "min": block.min(axis=0).tolist(),
+                "max": block.max(axis=0).tolist(),
+            })
+
+        meta = {
+            "id": sweep_id,
+            "start_time": start_time if start_time is not None else time.time(),
+            "device": device,
+            "parameters": list(parameters) if parameters is not None else None,
+            "count": count,
+            "chunks": chunks,
+        }
+        meta.update(extra)
+        self.index["sweeps"].append(meta)
+        self._save_index()
+        return sweep_id
+
+    def column(self, sweep_id, name):
+        """Memory-mapped view of one column of a sweep."""
+        self.sweep(sweep_id)
+        return np.load(os.path.join(self._sweep_dir(sweep_id), f"{name}.npy"), mmap_mode="r")
+
+    def load(self, sweep_id, columns=None, bounds=None):
+        """Load a sweep as a dict of arrays.
+
+        Without `bounds` the arrays are read-only memory maps. With
+        `bounds=(lo, hi)` (two xyz triples) only chunks whose bounding box
+        overlaps are read, and the result holds just the points inside.
+        """
+        meta = self.sweep(sweep_id)
+        names = list(columns) if columns is not None else list(COLUMNS)
+        maps = {name: self.column(sweep_id, name) for name in set(names) | ({"x", "y", "z"} if bounds else set())}
+
+        if bounds is None:
+            return {name: maps[name] for name in names}
+
+        lo = np.asarray(bounds[0], dtype=float)
+        hi = np.asarray(bounds[1], dtype=float)
+        parts = {name: [] for name in names}
+        for chunk in meta["chunks"]:
+            if np.any(np.asarray(chunk["max"]) < lo) or np.any(np.asarray(chunk["min"]) > hi):
+                continue
+            rows = slice(chunk["offset"], chunk["offset"] + chunk["count"])
+            xyz = np.column_stack((maps["x"][rows], maps["y"][rows], maps["z"][rows]))
+            inside = np.all((xyz >= lo) & (xyz <= hi), axis=1)
+            for name in names:
+                parts[name].append(np.asarray(maps[name][rows])[inside])
+
+        return {
+            name: np.concatenate(arrays) if arrays else np.empty(0, dtype=COLUMNS[name])
+            for name, arrays in parts.items()
+        }
@@ -61,16 +61,25 @@ void measure(int x, int y) {
   }
 }
 
-void sweep_handler(int a, int b, int c, int d, int e, int f) {
+// `start` is the grid index to resume from: samples are numbered in visiting
+// order, row by row, with odd rows running from the top of theta back down
+void sweep_handler(int a, int b, int c, int d, int e, int f, long start) {
+  if(c>0 ? a>b : a<b) return;
+  if(f>0 ? d>e : d<e) return;
+
+  long cols = (e - d) / f + 1;
+  long rows = (b - a) / c + 1;
+  if(start < 0 || start >= rows * cols) return;
+
+  int i = start / cols;
+  int col = start % cols;
+  if(i % 2 == 1) col = cols - 1 - col;
+  int x = a + i * c, y = d + col * f;
+
   Serial.println("xo");
-  mainStepper.step(a);
+  mainStepper.step(x);
   Serial.println("yo");
-  secondaryStepper.step(d);
-
-  int i = 0;
-  int x = a, y = d;
-  if(c>0 ? x>b : x<b) return;
-  if(f>0 ? y>e : y<e) return;
+  secondaryStepper.step(y);
   while(1) {
     if(i % 2 == 0) {
       while(1) {
@@ -123,7 +132,14 @@ void loop() {
       Serial.println("\nI");
       return;
     }
-    sweep_handler(input_ints[0],input_ints[1],input_ints[2],input_ints[3],input_ints[4],input_ints[5]);
+    // optional 7th argument: resume index (`SWEEP a b c d e f start`).
+    // Read the rest of the line (waits up to the stream timeout), since the
+    // digits may still be on the wire right after the separating space.
+    long start = 0;
+    String rest = Serial.readStringUntil('\n');
+    rest.trim();
+    if(rest.length() > 0) start = rest.toInt();
+    sweep_handler(input_ints[0],input_ints[1],input_ints[2],input_ints[3],input_ints[4],input_ints[5],start);
   }
 }
 
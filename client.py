@@ -1,10 +1,10 @@
 import sys
 import serial
 import time
-import math
+import argparse
 import threading
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog
 from queue import Queue
 
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
@@ -16,39 +16,66 @@ import open3d as o3d
 import numpy as np
 from PIL import Image, ImageTk
 
-REVOLUTION_STEPS = 200
-BAUDRATE = 115200
-TIMEOUT = 1
+from protocol import REVOLUTION_STEPS, BAUDRATE, TIMEOUT, MathUtils, SweepGrid, SweepProgress, parse_record, record_to_point, reconnect
+from acquisition import AcquisitionProcess, MP_CONTEXT
+from reconstruction import Reconstructor, save_mesh_ply
+from instrumentation import Instrumentation
+from archive import SessionArchive
+from range_image import RangeImage, ChangeDetector
+import splat
 
+MESH_INTERVAL = 2.0  # seconds between re-meshing snapshots
+STATS_INTERVAL = 500  # ms between stats panel refreshes
+SPLAT_PREVIEW_POINTS = 300_000  # points drawn by the splat view while it is being moved
+SPLAT_SETTLE = 200  # ms without mouse input before the splat view renders every point again
 
-class MathUtils:
-    @staticmethod
-    def clamp(val, min_val, max_val):
-        return min(max(val, min_val), max_val)
-
-    @staticmethod
-    def int_to_angle(val, steps=REVOLUTION_STEPS, min_angle=-math.pi, max_angle=math.pi):
-        val = ((val % REVOLUTION_STEPS) + REVOLUTION_STEPS) % REVOLUTION_STEPS
-        return min_angle + (max_angle - min_angle) * (val / steps)
-
-    @staticmethod
-    def spherical_to_cartesian(r, theta, phi):
-        x = r * math.sin(theta) * math.cos(phi)
-        y = r * math.sin(theta) * math.sin(phi)
-        z = r * math.cos(theta)
-        return x, y, z
+STAGES = ("serial_read", "parse", "queue_wait", "update_plot", "update_geometry", "update_mesh", "render_image")
 
 class SerialReader(threading.Thread):
-    def __init__(self, port, parameters, queue):
+    def __init__(self, port, parameters, queue, stats=None, progress=None, detector=None):
         super().__init__(daemon=True)
         self.port = port
         self.parameters = parameters
         self.queue = queue
+        self.stats = stats
+        # in delta mode, samples matching the previous sweep are dropped here
+        self.detector = detector
+        # shared with LidarApp, so a later resume keeps the cells collected here
+        self.progress = progress if progress is not None else SweepProgress(parameters)
         self.stop_flag = False
         self.ser = None
 
     def put(self, type_, payload=None):
-        self.queue.put((type_, payload))
+        if self.stats is not None and self.stats.enabled:
+            # enqueue time, for the queue wait measured in process_queue()
+            self.queue.put((type_, payload, time.perf_counter()))
+        else:
+            self.queue.put((type_, payload))
+
+    def send_sweep(self):
+        sweep_cmd = self.progress.resume_command()
+        self.ser.write(sweep_cmd.encode())
+        self.put("log", f"> {sweep_cmd.strip()}")
+
+    def reconnect(self):
+        if self.ser:
+            try:
+                self.ser.close()
+            except:
+                pass
+
+        while True:
+            self.ser = reconnect(self.port, lambda: self.stop_flag, lambda msg: self.put("log", msg))
+            if self.ser is None:
+                return False
+
+            self.put("log", f"Reconnected to {self.port}, resuming sweep at index {self.progress.next_index}.")
+            time.sleep(2)
+            try:
+                self.send_sweep()
+                return True
+            except serial.SerialException as err:
+                self.put("log", f"Failed to resume sweep: {err}")
 
     def run(self):
         try:
@@ -61,50 +88,71 @@ class SerialReader(threading.Thread):
         self.put("log", f"Connected to {self.port} at {BAUDRATE} baud.")
         time.sleep(2)
 
-        sweep_cmd = f"SWEEP {' '.join(str(p) for p in self.parameters)}\n"
         try:
-            self.ser.write(sweep_cmd.encode())
+            self.send_sweep()
         except:
             self.put("log", "Failed to send sweep command.")
             self.put("stopped")
             return
 
-        self.put("log", f"> {sweep_cmd.strip()}")
-
         while not self.stop_flag:
             try:
                 if not self.ser or not self.ser.is_open:
                     break
 
+                timed = self.stats is not None and self.stats.enabled
+                if timed:
+                    t0 = time.perf_counter()
+
                 line = self.ser.readline().decode(errors="ignore").strip()
+
+                if timed:
+                    t1 = time.perf_counter()
+                    self.stats.observe("serial_read", t1 - t0)
+
                 if not line:
                     continue
 
                 parts = line.split()
-                self.put("log", line)
+                if self.detector is None:
+                    self.put("log", line)
                 
-                if len(parts) == 4 and parts[0] == "R":
-                    try:
-                        phi_int = int(parts[1])
-                        theta_int = int(parts[2])
-                        r = float(parts[3])
-
-                        phi = MathUtils.int_to_angle(phi_int)
-                        theta = MathUtils.int_to_angle(theta_int)
-                        x, y, z = MathUtils.spherical_to_cartesian(r, theta, phi)
-                        print(f"{phi:.2f}, {theta:.2f}, {r:.2f}, x,y,z")
-
-                        self.put("point", (x, y, z))
-                    except ValueError:
-                        self.put("log", f"Corrupted packet data: {line}")
-                else:
+                try:
+                    record = parse_record(parts)
+                except ValueError:
+                    if timed:
+                        self.stats.count("corrupted")
+                    self.put("log", f"Corrupted packet data: {line}")
+                    continue
+
+                if record is None:
+                    if timed:
+                        self.stats.count("garbage")
                     self.put("log", f"Garbage ignored: {line}")
+                    continue
+
+                if not self.progress.accept(record[0], record[1]):
+                    self.put("log", f"Duplicate ignored: {line}")
+                    continue
+
+                if self.detector is not None and not self.detector.check(*record):
+                    if timed:
+                        self.stats.count("unchanged")
+                    continue
+
+                x, y, z = record_to_point(*record)
+
+                if timed:
+                    self.stats.observe("parse", time.perf_counter() - t1)
+                    self.stats.count("points")
+
+                self.put("point", (x, y, z, *record, time.time()))
 
             except (serial.SerialException, TypeError, OSError) as e:
                 if self.stop_flag:
                     break
-                else:
-                    self.put("log", f"Serial connection lost: {e}")
+                self.put("log", f"Serial connection lost: {e}")
+                if self.progress.complete or not self.reconnect():
                     break
             except Exception as e:
                 self.put("log", f"Unexpected error: {e}")
@@ -116,6 +164,7 @@ class SerialReader(threading.Thread):
                 pass
 
         self.put("log", "Serial thread stopped.")
+        self.put("progress", self.progress)
         self.put("stopped")
 
     def stop(self):
@@ -137,7 +186,10 @@ class EmbeddedOpen3D:
         self.panel.pack(fill=tk.BOTH, expand=True)
 
         self.vis = o3d.visualization.Visualizer()
-        self.vis.create_window(width=self.width, height=self.height, visible=False)
+        if not self.vis.create_window(width=self.width, height=self.height, visible=False):
+            # no GL context (headless node, remote session)
+            self.panel.destroy()
+            raise RuntimeError("Open3D could not create a window")
 
         opt = self.vis.get_render_option()
         opt.background_color = np.asarray([1.0, 1.0, 1.0])
@@ -153,10 +205,11 @@ class EmbeddedOpen3D:
         self.last_mouse_y = 0
         
         self.pcd = None
+        self.mesh = None
 
         self.render_image()
 
-    def update_geometry(self, points):
+    def update_geometry(self, points, highlight=None):
         if points.shape[0] == 0:
             return
             
@@ -176,6 +229,8 @@ class EmbeddedOpen3D:
             colormap = cm.get_cmap("jet")
 
         colors = colormap(norm_z)[:, :3]
+        if highlight is not None:
+            colors[highlight] = (1.0, 0.0, 1.0)
 
         if self.pcd is None:
             self.pcd = o3d.geometry.PointCloud()
@@ -190,6 +245,29 @@ class EmbeddedOpen3D:
 
         self.render_image()
 
+    def update_mesh(self, vertices, triangles):
+        if len(triangles) == 0:
+            if self.mesh is not None:
+                self.vis.remove_geometry(self.mesh, reset_bounding_box=False)
+                self.mesh = None
+                self.render_image()
+            return
+
+        first = self.mesh is None
+        if first:
+            self.mesh = o3d.geometry.TriangleMesh()
+        self.mesh.vertices = o3d.utility.Vector3dVector(vertices)
+        self.mesh.triangles = o3d.utility.Vector3iVector(triangles)
+        self.mesh.compute_vertex_normals()
+        self.mesh.paint_uniform_color([0.7, 0.7, 0.7])
+
+        if first:
+            self.vis.add_geometry(self.mesh, reset_bounding_box=self.pcd is None)
+        else:
+            self.vis.update_geometry(self.mesh)
+
+        self.render_image()
+
     def render_image(self):
         self.vis.poll_events()
         self.vis.update_renderer()
@@ -228,14 +306,159 @@ class EmbeddedOpen3D:
         self.render_image()
 
 
+class SplatViewer:
+    """Drop-in for EmbeddedOpen3D drawn with splat.render; needs no GL context.
+
+    Renders are coalesced: requests made while Tk is busy produce one frame
+    once it is idle. While the camera moves only a decimated cloud is drawn,
+    and the full cloud follows when the mouse has been still for SPLAT_SETTLE.
+    """
+
+    def __init__(self, parent, width=700, height=600, point_size=2.0):
+        self.parent = parent
+        self.width = width
+        self.height = height
+        self.point_size = point_size
+
+        self.panel = tk.Label(parent)
+        self.panel.pack(fill=tk.BOTH, expand=True)
+
+        self.panel.bind("<Button-1>", self.on_mouse_press)
+        self.panel.bind("<B1-Motion>", self.on_mouse_drag)
+        self.panel.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.panel.bind("<Button-4>", self.on_mouse_wheel)
+        self.panel.bind("<Button-5>", self.on_mouse_wheel)
+
+        self.last_mouse_x = 0
+        self.last_mouse_y = 0
+
+        self.camera = splat.Camera(width, height)
+        self.points = np.empty((0, 3), dtype=np.float32)
+        self.colors = None
+        self.mesh_points = np.empty((0, 3), dtype=np.float32)
+
+        self.render_pending = None
+        self.render_preview = False
+        self.settle_after = None
+
+        self.render_image()
+
+    def update_geometry(self, points, highlight=None):
+        if points.shape[0] == 0:
+            return
+
+        first = len(self.points) == 0
+        self.points = np.asarray(points, dtype=np.float32)
+        # colours only change with the data, not with the camera
+        self.colors = splat.height_colors(self.points)
+        if highlight is not None:
+            self.colors[highlight] = (255, 0, 255)
+        if first:
+            self.camera = splat.Camera.fit(self.points, self.width, self.height)
+
+        self.schedule_render()
+
+    def update_mesh(self, vertices, triangles):
+        # no shading here: draw the vertices of the mesh in grey
+        if len(triangles) == 0:
+            vertices = np.empty((0, 3), dtype=np.float32)
+        self.mesh_points = np.asarray(vertices, dtype=np.float32)
+        self.schedule_render()
+
+    def schedule_render(self, preview=False):
+        """Render when Tk is idle; the last request before then decides between preview and full."""
+        self.render_preview = preview
+        if self.render_pending is None:
+            self.render_pending = self.panel.after_idle(self._render_scheduled)
+
+    def _render_scheduled(self):
+        self.render_pending = None
+        self.render_image(preview=self.render_preview)
+
+    def _camera_moved(self):
+        self.schedule_render(preview=True)
+        if self.settle_after is not None:
+            self.panel.after_cancel(self.settle_after)
+        self.settle_after = self.panel.after(SPLAT_SETTLE, self._settled)
+
+    def _settled(self):
+        self.settle_after = None
+        self.schedule_render()
+
+    def render_image(self, preview=False):
+        points, colors = self.points, self.colors
+        if preview and len(points) > SPLAT_PREVIEW_POINTS:
+            stride = -(-len(points) // SPLAT_PREVIEW_POINTS)
+            points, colors = points[::stride], colors[::stride]
+        if len(self.mesh_points):
+            grey = np.full((len(self.mesh_points), 3), 180, dtype=np.uint8)
+            points = np.vstack((points, self.mesh_points))
+            colors = np.vstack((colors, grey)) if colors is not None else grey
+
+        img_data = splat.render(points, self.camera, colors, self.point_size)
+
+        img_pil = Image.fromarray(img_data)
+        img_tk = ImageTk.PhotoImage(image=img_pil)
+
+        self.panel.configure(image=img_tk)
+        self.panel.image = img_tk
+
+    def on_mouse_press(self, event):
+        self.last_mouse_x = event.x
+        self.last_mouse_y = event.y
+
+    def on_mouse_drag(self, event):
+        dx = event.x - self.last_mouse_x
+        dy = event.y - self.last_mouse_y
+
+        self.camera.rotate(-dx * 0.5, dy * 0.5)
+
+        self.last_mouse_x = event.x
+        self.last_mouse_y = event.y
+        self._camera_moved()
+
+    def on_mouse_wheel(self, event):
+        if event.num == 5 or event.delta < 0:
+            self.camera.zoom(1.1)
+        elif event.num == 4 or event.delta > 0:
+            self.camera.zoom(1 / 1.1)
+
+        self._camera_moved()
+
+
 class LidarApp:
-    def __init__(self, port):
+    def __init__(self, port, use_process=False, viewer="open3d"):
         self.port = port
+        self.use_process = use_process
         self.serial_thread = None
         self.x_data = []
         self.y_data = []
         self.z_data = []
-        self.queue = Queue()
+        self.points_version = 0  # bumped by _store_point/_clear_points, gates re-meshing
+        # raw samples behind each point, kept for the session archive
+        self.phi_data = []
+        self.theta_data = []
+        self.r_data = []
+        self.t_data = []
+        self.sweep_start_time = None
+        self.archive = None
+        self.browser_window = None
+        # the current sweep as an organized (phi, theta) grid, None for off-grid data
+        self.range_image = None
+        # delta mode: compare a rescan against the previous sweep and keep only changes
+        self.detector = None
+        self.cell_slots = {}         # (row, col) -> index into the point lists
+        self.changed_points = set()  # indices of points replaced or added by the rescan
+        self.depth_window = None
+        self.depth_after = None
+        self.depth_drawn = None  # (range image, points_version) shown in the depth window
+        # the acquisition process can only talk through a multiprocessing queue
+        self.queue = MP_CONTEXT.Queue() if use_process else Queue()
+        self.reconstructor = None
+        self.mesh_submitted_at = 0.0
+        self.mesh_submitted_version = None
+        self.sweep_params = None
+        self.sweep_progress = None  # SweepProgress of the current sweep, kept across resumes
 
         self.root = tk.Tk()
         self.root.title("3D LIDAR Simulation Viewer")
@@ -275,7 +498,28 @@ class LidarApp:
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.frame_mpl)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-        self.o3d_viewer = EmbeddedOpen3D(self.frame_o3d, width=700, height=650)
+        self.o3d_viewer = None
+        if viewer == "open3d":
+            try:
+                self.o3d_viewer = EmbeddedOpen3D(self.frame_o3d, width=700, height=650)
+            except RuntimeError as e:
+                self.queue.put(("log", f"{e}, falling back to the NumPy splat viewer."))
+        if self.o3d_viewer is None:
+            self.o3d_viewer = SplatViewer(self.frame_o3d, width=700, height=650)
+
+        self.stats = Instrumentation()
+        for stage in STAGES:
+            # create up front: the serial thread must not add keys while the panel iterates
+            self.stats.histogram(stage)
+        for counter in ("points", "corrupted", "garbage", "unchanged"):
+            self.stats.count(counter, 0)
+        self.stats.instrument(self, "update_plot", "update_plot")
+        self.stats.instrument(self.o3d_viewer, "update_geometry", "update_geometry")
+        self.stats.instrument(self.o3d_viewer, "update_mesh", "update_mesh")
+        self.stats.instrument(self.o3d_viewer, "render_image", "render_image")
+        self.stats_window = None
+        self.stats_text = None
+        self.stats_after = None
 
         self.log_text = tk.Text(frame_logs, height=8, state=tk.DISABLED)
         self.log_text.pack(fill=tk.BOTH, expand=True)
@@ -292,9 +536,26 @@ class LidarApp:
 
         ttk.Button(self.frame_controls, text="Start", command=self.start).pack(side=tk.LEFT, padx=10)
         ttk.Button(self.frame_controls, text="Stop", command=self.stop).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Resume", command=self.resume).pack(side=tk.LEFT, padx=10)
         ttk.Button(self.frame_controls, text="Save PLY", command=self.save_ply).pack(side=tk.LEFT, padx=10)
+        self.delta_enabled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.frame_controls, text="Delta", variable=self.delta_enabled).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Save Changes", command=self.save_changes).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Open Archive", command=self.open_archive).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Archive", command=self.save_to_archive).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Browse", command=self.open_browser).pack(side=tk.LEFT, padx=10)
         
         ttk.Button(self.frame_controls, text="Show/Update Open3D", command=self.show_open3d).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Depth Map", command=self.open_depth_map).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Grid Mesh", command=self.show_grid_mesh).pack(side=tk.LEFT, padx=10)
+
+        self.mesh_enabled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.frame_controls, text="Mesh", variable=self.mesh_enabled, command=self.toggle_mesh).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Save Mesh", command=self.save_mesh).pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.frame_controls, text="Stats", command=self.open_stats_panel).pack(side=tk.LEFT, padx=10)
+
+        self.stats_label = ttk.Label(self.frame_controls, text="")
+        self.stats_label.pack(side=tk.LEFT, padx=10)
 
         self.root.after(10, self.process_queue)
         self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
@@ -305,11 +566,44 @@ class LidarApp:
         self.log_text.configure(state=tk.DISABLED)
         self.log_text.see(tk.END)
 
-    def _real_add_point(self, x, y, z):
+    def _real_add_point(self, x, y, z, phi_int, theta_int, r, t):
+        self._store_point(x, y, z, phi_int, theta_int, r, t)
+        self.update_plot()
+
+    def _store_point(self, x, y, z, phi_int, theta_int, r, t):
+        # bumped on every change, including in-place replacements by a Delta rescan
+        self.points_version += 1
+        cell = None
+        if self.range_image is not None:
+            cell = self.range_image.update(phi_int, theta_int, r, (x, y, z))
+
+        if self.detector is not None:
+            slot = self.cell_slots.get(cell) if cell is not None else None
+            if slot is not None:
+                # a changed cell of the rescan replaces the previous sweep's sample
+                self.x_data[slot], self.y_data[slot], self.z_data[slot] = x, y, z
+                self.phi_data[slot], self.theta_data[slot] = phi_int, theta_int
+                self.r_data[slot], self.t_data[slot] = r, t
+                self.changed_points.add(slot)
+                return
+            if cell is not None:
+                self.cell_slots[cell] = len(self.x_data)
+            self.changed_points.add(len(self.x_data))
+
         self.x_data.append(x)
         self.y_data.append(y)
         self.z_data.append(z)
-        self.update_plot()
+        self.phi_data.append(phi_int)
+        self.theta_data.append(theta_int)
+        self.r_data.append(r)
+        self.t_data.append(t)
+
+    def _clear_points(self):
+        for data in (self.x_data, self.y_data, self.z_data, self.phi_data, self.theta_data, self.r_data, self.t_data):
+            data.clear()
+        self.points_version += 1
+        self.cell_slots.clear()
+        self.changed_points.clear()
 
     def _add_control(self, label, default):
         ttk.Label(self.frame_controls, text=label).pack(side=tk.LEFT)
@@ -318,32 +612,215 @@ class LidarApp:
         entry.pack(side=tk.LEFT, padx=2)
         return entry
 
+    def _drain_ring(self):
+        chunk = self.serial_thread.ring.read()
+        if not len(chunk):
+            return
+
+        # ring timestamps are monotonic; the archive wants wall-clock time
+        wall_offset = time.time() - time.monotonic()
+        if self.stats.enabled:
+            self.stats.histogram("queue_wait").observe_many(time.monotonic() - chunk["t_read"])
+            self.stats.count("points", len(chunk))
+
+        if self.detector is not None:
+            changed = chunk[self.detector.check_many(chunk["phi"], chunk["theta"], chunk["r"])]
+            if self.stats.enabled:
+                self.stats.count("unchanged", len(chunk) - len(changed))
+            for rec in changed.tolist():
+                t_read, phi_int, theta_int, r, x, y, z = rec
+                self._store_point(x, y, z, phi_int, theta_int, r, t_read + wall_offset)
+            added = len(changed)
+        else:
+            added = len(chunk)
+            self.points_version += 1
+            self.x_data.extend(chunk["x"].tolist())
+            self.y_data.extend(chunk["y"].tolist())
+            self.z_data.extend(chunk["z"].tolist())
+            self.phi_data.extend(chunk["phi"].tolist())
+            self.theta_data.extend(chunk["theta"].tolist())
+            self.r_data.extend(chunk["r"].tolist())
+            self.t_data.extend((chunk["t_read"] + wall_offset).tolist())
+            if self.range_image is not None:
+                points = np.column_stack((chunk["x"], chunk["y"], chunk["z"]))
+                self.range_image.update_many(chunk["phi"], chunk["theta"], chunk["r"], points)
+        if added:
+            self.update_plot()
+
+        stats = self.serial_thread.stats()
+        self.stats_label.configure(text=self._format_ring_stats(stats))
+
+    @staticmethod
+    def _format_ring_stats(stats):
+        return (
+            f"{stats['received']} pts, {stats['overruns']} overruns, "
+            f"latency {stats['latency_avg_ms']:.1f}/{stats['latency_max_ms']:.1f} ms"
+        )
+
     def update_plot(self):
         self.ax.cla()
         self.ax.scatter(self.x_data, self.y_data, self.z_data, s=5)
+        if self.changed_points:
+            changed = list(self.changed_points)
+            self.ax.scatter(
+                [self.x_data[i] for i in changed], [self.y_data[i] for i in changed], [self.z_data[i] for i in changed],
+                s=12, color="magenta",
+            )
         self.ax.scatter([0], [0], [0], s=80, color="red")
         self.ax.set_title("Live LIDAR Data (Matplotlib)")
         self.canvas.draw_idle()
 
     def process_queue(self):
+        try:
+            self._process_queue()
+        finally:
+            # keep polling whatever went wrong, or the GUI stops taking data for good
+            self.root.after(10, self.process_queue)
+
+    def _process_queue(self):
+        try:
+            if isinstance(self.serial_thread, AcquisitionProcess):
+                self._drain_ring()
+
+            if self.reconstructor is not None:
+                self._update_mesh()
+        except Exception as e:
+            self._real_log(f"Unexpected error: {e}")
+
         try:
             while True:
-                msg_type, payload = self.queue.get_nowait()
+                msg = self.queue.get_nowait()
+                msg_type, payload = msg[0], msg[1]
+                if len(msg) > 2:
+                    self.stats.observe("queue_wait", time.perf_counter() - msg[2])
 
                 if msg_type == "log":
                     self._real_log(payload)
 
                 elif msg_type == "point":
-                    x, y, z = payload
-                    self._real_add_point(x, y, z)
+                    self._real_add_point(*payload)
+
+                elif msg_type == "timings":
+                    # serial_read / parse as measured in the acquisition process
+                    if self.stats.enabled:
+                        for stage in ("serial_read", "parse"):
+                            self.stats.histogram(stage).observe_many(payload[stage])
+                        for counter in ("corrupted", "garbage"):
+                            self.stats.count(counter, payload[counter])
+
+                elif msg_type == "progress":
+                    # the process path sends back an updated copy
+                    self.sweep_progress = payload
 
                 elif msg_type == "stopped":
+                    if isinstance(self.serial_thread, AcquisitionProcess):
+                        self._drain_ring()
+                        self._real_log(f"Acquisition stats: {self.serial_thread.stats()}")
+                        self.serial_thread.close()
                     self.serial_thread = None
 
         except:
             pass
 
-        self.root.after(10, self.process_queue)
+    def toggle_mesh(self):
+        if self.mesh_enabled.get():
+            if self.reconstructor is None:
+                self.reconstructor = Reconstructor(log=self._real_log)
+            self.mesh_submitted_version = None
+            self._real_log("Background surface reconstruction enabled.")
+        elif self.reconstructor is not None:
+            self.reconstructor.shutdown()
+            self.reconstructor = None
+            self.o3d_viewer.update_mesh(*Reconstructor.empty_mesh())
+            self._real_log("Background surface reconstruction disabled.")
+
+    def _update_mesh(self):
+        if self.reconstructor.poll():
+            vertices, triangles = self.reconstructor.mesh()
+            self.o3d_viewer.update_mesh(vertices, triangles)
+
+        if not self.x_data or self.points_version == self.mesh_submitted_version:
+            return
+        if time.monotonic() - self.mesh_submitted_at < MESH_INTERVAL:
+            return
+
+        points = np.vstack((self.x_data, self.y_data, self.z_data)).T
+        queued = self.reconstructor.submit(points, self._point_normals())
+        self.mesh_submitted_at = time.monotonic()
+        self.mesh_submitted_version = self.points_version
+        if queued:
+            self._real_log(f"Re-meshing {queued} changed region(s).")
+
+    def _point_normals(self):
+        """Range-image normal of every stored point (NaN off the grid), or None without a grid."""
+        if self.range_image is None:
+            return None
+        rows, cols, on_grid = self.range_image.cells(self.phi_data, self.theta_data)
+        normals = np.full((len(self.phi_data), 3), np.nan, dtype=np.float32)
+        normals[on_grid] = self.range_image.normals()[rows[on_grid], cols[on_grid]]
+        return normals
+
+    def _grid_mesh(self):
+        """Mesh of the range image after filling single-cell holes, with grid normals."""
+        filled = self.range_image.fill_holes()
+        vertices, triangles = filled.mesh()
+        normals = np.nan_to_num(filled.normals()[filled.valid()])
+        return vertices, triangles, normals
+
+    def open_stats_panel(self):
+        if self.stats_window is not None:
+            self.stats_window.lift()
+            return
+
+        self.stats_window = tk.Toplevel(self.root)
+        self.stats_window.title("Pipeline stats")
+        self.stats_window.protocol("WM_DELETE_WINDOW", self.close_stats_panel)
+
+        controls = ttk.Frame(self.stats_window)
+        controls.pack(side=tk.TOP, fill=tk.X, pady=5)
+
+        enabled = tk.BooleanVar(value=self.stats.enabled)
+        ttk.Checkbutton(
+            controls, text="Instrument", variable=enabled,
+            command=lambda: self.stats.set_enabled(enabled.get()),
+        ).pack(side=tk.LEFT, padx=10)
+        ttk.Button(controls, text="Reset", command=self.stats.reset).pack(side=tk.LEFT, padx=10)
+        ttk.Button(controls, text="Dump JSON", command=self.dump_stats_json).pack(side=tk.LEFT, padx=10)
+        ttk.Button(controls, text="Dump Prometheus", command=self.dump_stats_prometheus).pack(side=tk.LEFT, padx=10)
+
+        self.stats_text = tk.Text(self.stats_window, width=80, height=16, font="TkFixedFont", state=tk.DISABLED)
+        self.stats_text.pack(fill=tk.BOTH, expand=True)
+        self.refresh_stats_panel()
+
+    def close_stats_panel(self):
+        if self.stats_after is not None:
+            self.root.after_cancel(self.stats_after)
+            self.stats_after = None
+        self.stats_window.destroy()
+        self.stats_window = None
+        self.stats_text = None
+
+    def refresh_stats_panel(self):
+        if self.stats_text is None:
+            return
+
+        self.stats_text.configure(state=tk.NORMAL)
+        self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert(tk.END, self.stats.summary())
+        self.stats_text.configure(state=tk.DISABLED)
+        self.stats_after = self.root.after(STATS_INTERVAL, self.refresh_stats_panel)
+
+    def dump_stats_json(self):
+        filename = "stats.json"
+        with open(filename, "w") as f:
+            f.write(self.stats.to_json())
+        self._real_log(f"Saved stats to {filename}")
+
+    def dump_stats_prometheus(self):
+        filename = "stats.prom"
+        with open(filename, "w") as f:
+            f.write(self.stats.to_prometheus())
+        self._real_log(f"Saved stats to {filename}")
 
     def start(self):
         if self.serial_thread:
@@ -359,68 +836,361 @@ class LidarApp:
                 int(MathUtils.clamp(float(self.entry_e.get()) / 360 * REVOLUTION_STEPS, 0, 4095)),
                 int(MathUtils.clamp(float(self.entry_f.get()) / 360 * REVOLUTION_STEPS, 0, 4095)),
             ]
+            SweepGrid(*params)
         except ValueError:
             self._real_log("Invalid sweep parameters.")
             return
 
-        self.x_data.clear()
-        self.y_data.clear()
-        self.z_data.clear()
-        
-        self.serial_thread = SerialReader(self.port, params, self.queue)
-        self.serial_thread.start()
+        rescan = (
+            self.delta_enabled.get()
+            and self.range_image is not None
+            and self.sweep_params == params
+            and self.range_image.valid().any()
+        )
+
+        if rescan:
+            self._start_rescan()
+        else:
+            self.detector = None
+            self._clear_points()
+            if self.reconstructor is not None:
+                self.reconstructor.clear()
+                self.mesh_submitted_version = None
+                self.o3d_viewer.update_mesh(*Reconstructor.empty_mesh())
+            self.range_image = RangeImage.from_parameters(params)
+
+        self.sweep_params = params
+        self.sweep_progress = SweepProgress(params)
+        self.sweep_start_time = time.time()
+        self._launch()
 
         self._real_log("Started reading from simulated device.")
 
-    def stop(self):
+    def _start_rescan(self):
+        # the finished sweep becomes the reference; the new image starts as its copy
+        # so that cells without changes keep their previous values
+        reference = self.range_image
+        previous_noise = self.detector.noise if self.detector is not None else None
+        self.detector = ChangeDetector(reference, noise=previous_noise)
+        self.range_image = reference.copy()
+
+        self.cell_slots.clear()
+        self.changed_points.clear()
+        rows, cols, on_grid = reference.cells(self.phi_data, self.theta_data)
+        for slot in np.nonzero(on_grid)[0].tolist():
+            self.cell_slots[(int(rows[slot]), int(cols[slot]))] = slot
+
+        self._real_log("Rescanning: forwarding only cells that differ from the previous sweep.")
+
+    def resume(self):
         if self.serial_thread:
-            self.serial_thread.stop()
-            self._real_log("Stopping serial thread...")
+            self._real_log("Already running.")
+            return
 
-    def save_ply(self):
-        if not self.x_data:
-            self._real_log("No data to save.")
+        if self.sweep_progress is None:
+            self._real_log("No sweep to resume.")
             return
 
-        filename = "scan_output.ply"
-        n = len(self.x_data)
+        if self.sweep_progress.complete:
+            self._real_log("Sweep already complete.")
+            return
+
+        # keep the collected points; the reader drops cells it already has
+        self._launch()
+        self._real_log(f"Resuming sweep at index {self.sweep_progress.next_index}.")
+
+    def _launch(self):
+        if self.use_process:
+            self.serial_thread = AcquisitionProcess(self.port, self.sweep_params, self.queue, self.sweep_progress)
+        else:
+            self.serial_thread = SerialReader(
+                self.port, self.sweep_params, self.queue, self.stats, self.sweep_progress, self.detector
+            )
+        self.serial_thread.start()
+
+    def stop(self):
+        if self.serial_thread:
+            self.serial_thread.stop()
+            self._real_log("Stopping serial thread...")
 
+    @staticmethod
+    def _write_ply(filename, xs, ys, zs):
         with open(filename, "w") as f:
             f.write("ply\n")
             f.write("format ascii 1.0\n")
-            f.write(f"element vertex {n}\n")
+            f.write(f"element vertex {len(xs)}\n")
             f.write("property float x\n")
             f.write("property float y\n")
             f.write("property float z\n")
             f.write("end_header\n")
 
-            for x, y, z in zip(self.x_data, self.y_data, self.z_data):
+            for x, y, z in zip(xs, ys, zs):
                 f.write(f"{x} {y} {z}\n")
 
+    def save_ply(self):
+        if not self.x_data:
+            self._real_log("No data to save.")
+            return
+
+        filename = "scan_output.ply"
+        self._write_ply(filename, self.x_data, self.y_data, self.z_data)
         self._real_log(f"Saved point cloud to {filename}")
 
+    def save_changes(self):
+        if not self.changed_points:
+            self._real_log("No changes to save.")
+            return
+
+        filename = "scan_changes.ply"
+        changed = sorted(self.changed_points)
+        self._write_ply(
+            filename,
+            [self.x_data[i] for i in changed],
+            [self.y_data[i] for i in changed],
+            [self.z_data[i] for i in changed],
+        )
+        self._real_log(f"Saved {len(changed)} changed points to {filename}")
+
+    def save_mesh(self):
+        normals = None
+        if self.reconstructor is not None:
+            vertices, triangles = self.reconstructor.mesh()
+        elif self.range_image is not None:
+            vertices, triangles, normals = self._grid_mesh()
+        else:
+            self._real_log("Enable meshing first.")
+            return
+
+        if len(triangles) == 0:
+            self._real_log("No mesh to save yet.")
+            return
+
+        filename = "scan_mesh.ply"
+        save_mesh_ply(filename, vertices, triangles, normals)
+        self._real_log(f"Saved mesh ({len(triangles)} triangles) to {filename}")
+
+    def show_grid_mesh(self):
+        if self.range_image is None:
+            self._real_log("No sweep grid for the current data.")
+            return
+
+        vertices, triangles, _ = self._grid_mesh()
+        self.o3d_viewer.update_mesh(vertices, triangles)
+        self._real_log(f"Grid mesh: {len(triangles)} triangles from {len(vertices)} cells.")
+
+    def open_depth_map(self):
+        if self.range_image is None:
+            self._real_log("No sweep grid for the current data.")
+            return
+
+        if self.depth_window is not None:
+            self.depth_window.lift()
+            return
+
+        self.depth_window = tk.Toplevel(self.root)
+        self.depth_window.title("Range image")
+        self.depth_window.protocol("WM_DELETE_WINDOW", self.close_depth_map)
+
+        self.depth_fig = Figure(figsize=(6, 4))
+        self.depth_ax = self.depth_fig.add_subplot(111)
+        self.depth_canvas = FigureCanvasTkAgg(self.depth_fig, master=self.depth_window)
+        self.depth_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.depth_drawn = None
+        self.refresh_depth_map()
+
+    def close_depth_map(self):
+        if self.depth_after is not None:
+            self.root.after_cancel(self.depth_after)
+            self.depth_after = None
+        self.depth_window.destroy()
+        self.depth_window = None
+
+    def refresh_depth_map(self):
+        # redraw only when the grid was replaced or a point stored since the last draw
+        drawn = (self.range_image, self.points_version)
+        if self.range_image is not None and drawn != self.depth_drawn:
+            self.depth_drawn = drawn
+            self.depth_ax.cla()
+            self.depth_ax.imshow(self.range_image.depth_map(), cmap="jet", interpolation="nearest", aspect="auto")
+            # depth discontinuities in black on top
+            edges = np.where(self.range_image.edges(), 1.0, np.nan)
+            self.depth_ax.imshow(edges, cmap="Greys", vmin=0, vmax=1, interpolation="nearest", aspect="auto")
+            self.depth_ax.set_xlabel("theta index")
+            self.depth_ax.set_ylabel("phi index")
+            self.depth_canvas.draw_idle()
+        self.depth_after = self.root.after(STATS_INTERVAL, self.refresh_depth_map)
+
+    def open_archive(self):
+        path = filedialog.askdirectory(title="Open or create session archive", mustexist=False)
+        if not path:
+            return False
+
+        try:
+            self.archive = SessionArchive(path)
+        except (OSError, ValueError) as err:
+            self._real_log(f"Cannot open archive: {err}")
+            return False
+
+        self._real_log(f"Opened archive {path} ({len(self.archive.sweeps())} sweeps).")
+        if self.browser_window is not None:
+            self.browser_window.title(f"Archive: {path}")
+            self.refresh_browser()
+        return True
+
+    def save_to_archive(self):
+        if not self.x_data:
+            self._real_log("No data to archive.")
+            return
+
+        if self.archive is None and not self.open_archive():
+            return
+
+        try:
+            sweep_id = self.archive.append(
+                {
+                    "t": self.t_data, "phi": self.phi_data, "theta": self.theta_data, "r": self.r_data,
+                    "x": self.x_data, "y": self.y_data, "z": self.z_data,
+                },
+                parameters=self.sweep_params,
+                device=self.port,
+                start_time=self.sweep_start_time,
+                revolution_steps=REVOLUTION_STEPS,
+            )
+        except (OSError, ValueError) as err:
+            # e.g. a sweep directory left behind by an interrupted append
+            self._real_log(f"Cannot archive sweep: {err}")
+            return
+        self._real_log(f"Archived {len(self.x_data)} points as sweep {sweep_id}.")
+        if self.browser_window is not None:
+            self.refresh_browser()
+
+    def open_browser(self):
+        if self.archive is None and not self.open_archive():
+            return
+
+        if self.browser_window is not None:
+            self.browser_window.lift()
+            self.refresh_browser()
+            return
+
+        self.browser_window = tk.Toplevel(self.root)
+        self.browser_window.title(f"Archive: {self.archive.path}")
+        self.browser_window.protocol("WM_DELETE_WINDOW", self.close_browser)
+
+        self.browser_list = tk.Listbox(self.browser_window, width=90, height=12, font="TkFixedFont")
+        self.browser_list.pack(fill=tk.BOTH, expand=True)
+
+        controls = ttk.Frame(self.browser_window)
+        controls.pack(side=tk.BOTTOM, fill=tk.X, pady=5)
+        ttk.Label(controls, text="bounds (xmin ymin zmin xmax ymax zmax):").pack(side=tk.LEFT)
+        self.browser_bounds = ttk.Entry(controls, width=30)
+        self.browser_bounds.pack(side=tk.LEFT, padx=2)
+        ttk.Button(controls, text="Load", command=self.load_from_archive).pack(side=tk.LEFT, padx=10)
+
+        self.refresh_browser()
+
+    def close_browser(self):
+        self.browser_window.destroy()
+        self.browser_window = None
+
+    def refresh_browser(self):
+        self.browser_sweeps = self.archive.sweeps()
+        self.browser_list.delete(0, tk.END)
+        for meta in self.browser_sweeps:
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(meta["start_time"]))
+            params = " ".join(str(p) for p in meta["parameters"]) if meta["parameters"] else "-"
+            self.browser_list.insert(
+                tk.END, f"{meta['id']:>4}  {started}  {meta['count']:>8} pts  {meta['device']}  SWEEP {params}"
+            )
+
+    def load_from_archive(self):
+        selection = self.browser_list.curselection()
+        if not selection:
+            self._real_log("Select a sweep to load.")
+            return
+
+        if self.serial_thread:
+            self._real_log("Stop the running sweep first.")
+            return
+
+        bounds = None
+        text = self.browser_bounds.get().split()
+        if text:
+            try:
+                values = [float(v) for v in text]
+                if len(values) != 6:
+                    raise ValueError
+            except ValueError:
+                self._real_log("Bounds need six numbers.")
+                return
+            bounds = (values[:3], values[3:])
+
+        meta = self.browser_sweeps[selection[0]]
+        columns = self.archive.load(meta["id"], bounds=bounds)
+
+        self.detector = None
+        self._clear_points()
+        self.x_data.extend(columns["x"].tolist())
+        self.y_data.extend(columns["y"].tolist())
+        self.z_data.extend(columns["z"].tolist())
+        self.phi_data.extend(columns["phi"].tolist())
+        self.theta_data.extend(columns["theta"].tolist())
+        self.r_data.extend(columns["r"].tolist())
+        self.t_data.extend(columns["t"].tolist())
+        self.sweep_params = meta["parameters"]
+        self.sweep_start_time = meta["start_time"]
+        self.range_image = None
+        if meta["parameters"]:
+            self.range_image = RangeImage.from_parameters(meta["parameters"])
+            points = np.column_stack((columns["x"], columns["y"], columns["z"]))
+            self.range_image.update_many(columns["phi"], columns["theta"], columns["r"], points)
+        # an archived sweep is a finished dataset, not something to resume
+        self.sweep_progress = None
+
+        self.update_plot()
+        self._real_log(f"Loaded {len(self.x_data)} points from sweep {meta['id']}.")
+        self.show_open3d()
+
     def show_open3d(self):
         if not self.x_data:
             self._real_log("No data to display in Open3D.")
             return
 
         points = np.vstack((self.x_data, self.y_data, self.z_data)).T
+        highlight = list(self.changed_points) if self.changed_points else None
 
-        self.o3d_viewer.update_geometry(points)
+        self.o3d_viewer.update_geometry(points, highlight)
         self._real_log(f"Updated Open3D view with {len(points)} points.")
 
     def exit_app(self):
         self.stop()
+        if self.reconstructor is not None:
+            self.reconstructor.shutdown()
+        if isinstance(self.serial_thread, AcquisitionProcess):
+            self.serial_thread.close()
         self.root.destroy()
 
     def run(self):
         self.root.mainloop()
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python lidar.py <serialport>")
-        sys.exit(1)
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="3D LIDAR viewer")
+    parser.add_argument("port", help="serial port of the scanner")
+    parser.add_argument(
+        "--process",
+        action="store_true",
+        help="read and convert points in a separate process (shared-memory ring buffer)",
+    )
+    parser.add_argument(
+        "--viewer",
+        choices=("open3d", "splat"),
+        default="open3d",
+        help="3D panel backend; splat needs no GL context (used automatically if Open3D fails)",
+    )
+    return parser.parse_args(argv)
+
 
-    PORT = sys.argv[1]
-    app = LidarApp(PORT)
-    app.run()
\ No newline at end of file
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    app = LidarApp(args.port, use_process=args.process, viewer=args.viewer)
+    app.run()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Generate synthetic sweeps with ground truth, using the script.py arm model.
+
+Writes `<out>.txt` with the wire-format stream a device would send
+(`R <phi> <theta> <dist>` per sample, `E` for a failed measurement) and
+`<out>.npz` with the ground truth of every sample.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from protocol import SweepGrid
+
+# same conventions as script.py
+REVOLUTION_STEPS = 4096
+MAX_RANGE = 1023
+
+DEFAULT_SCENE = {
+    "boxes": [
+        {"name": "room", "min": [-100, -200, -50], "max": [200, 300, 150]},
+        {"name": "table", "min": [-50, -50, -50], "max": [50, 50, 0]},
+    ],
+    "max_range": MAX_RANGE,
+}
+
+CHUNK = 1 << 16
+
+
+@dataclass
+class Noise:
+    sigma: float = 0.0        # gaussian range noise, in range units
+    dropout: float = 0.0      # probability of a failed measurement (`E`)
+    spike: float = 0.0        # probability of a uniform random range
+    seed: int = 0
+
+
+@dataclass
+class Job:
+    sweep: int
+    parameters: tuple[int, int, int, int, int, int]
+    start: int
+    stop: int
+    chunk: int
+    scene: dict = field(default_factory=lambda: DEFAULT_SCENE)
+    noise: Noise = field(default_factory=Noise)
+
+
+def int_to_angle(val: np.ndarray, min_angle: float = -np.pi, max_angle: float = np.pi) -> np.ndarray:
+    val = np.clip(val, 0, REVOLUTION_STEPS - 1)
+    return min_angle + (max_angle - min_angle) * (val / REVOLUTION_STEPS)
+
+
+def rotate(v: np.ndarray, axis: np.ndarray, angle: np.ndarray) -> np.ndarray:
+    """Rodrigues rotation of rows of `v` about rows of `axis` (as script.rot)."""
+    axis = axis / np.linalg.norm(axis, axis=-1, keepdims=True)
+    cos = np.cos(angle)[:, None]
+    sin = np.sin(angle)[:, None]
+    dot = np.sum(axis * v, axis=-1, keepdims=True)
+    return v * cos + np.cross(axis, v) * sin + axis * dot * (1 - cos)
+
+
+def arm_rays(phi: np.ndarray, theta: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sensor origin pC and beam direction Dr, vectorized script.get_arm_positions."""
+    n = len(phi)
+    pB = np.array([0.0, 4, 0]) + np.array([0.0, -4, 1])
+    C = np.broadcast_to([0.0, 0, 0.5], (n, 3))
+    Cd = np.broadcast_to([0.0, 1, 0], (n, 3))
+    D = np.broadcast_to([0.0, 1, 0], (n, 3))
+    Cr = rotate(C, Cd, phi)
+    Dr = rotate(D, Cr, theta)
+    return pB + Cr, Dr
+
+
+def raycast(origin: np.ndarray, direction: np.ndarray, scene: dict) -> np.ndarray:
+    """Distance to the nearest box along each ray, capped at max_range (script.raycast)."""
+    best = np.full(len(origin), np.inf)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / direction
+        for box in scene["boxes"]:
+            t1 = (np.asarray(box["min"]) - origin) * inv
+            t2 = (np.asarray(box["max"]) - origin) * inv
+            tmin = np.max(np.minimum(t1, t2), axis=1)
+            tmax = np.min(np.maximum(t1, t2), axis=1)
+            hit = (tmax >= 0) & (tmin <= tmax)
+            t = np.where(tmin >= 0, tmin, tmax)
+            dist = np.where(hit, t * np.linalg.norm(direction, axis=1), np.inf)
+            best = np.minimum(best, dist)
+    return np.minimum(best, scene.get("max_range", MAX_RANGE))
+
+
+def run_job(job: Job) -> tuple[bytes, dict[str, np.ndarray]]:
+    grid = SweepGrid(*job.parameters)
+    index = np.arange(job.start, job.stop)
+    row, col = np.divmod(index, grid.cols)
+    col = np.where(row % 2 == 1, grid.cols - 1 - col, col)
+    phi_int = grid.a + row * grid.c
+    theta_int = grid.d + col * grid.f
+
+    origin, direction = arm_rays(int_to_angle(phi_int), int_to_angle(theta_int))
+    true_range = raycast(origin, direction, job.scene)
+
+    # seeded per chunk, so the output does not depend on the number of workers
+    rng = np.random.default_rng([job.noise.seed, job.sweep, job.chunk])
+    measured = true_range + rng.normal(0.0, job.noise.sigma, len(index)) if job.noise.sigma else true_range.copy()
+    spike = rng.random(len(index)) < job.noise.spike
+    measured[spike] = rng.uniform(0, job.scene.get("max_range", MAX_RANGE), int(spike.sum()))
+    dropout = rng.random(len(index)) < job.noise.dropout
+    # the device truncates (script.raycast uses int()), it does not round
+    measured = np.clip(np.floor(measured), 0, job.scene.get("max_range", MAX_RANGE)).astype(np.int32)
+
+    lines = [
+        "E" if dropped else f"R {p} {t} {r}"
+        for p, t, r, dropped in zip(phi_int.tolist(), theta_int.tolist(), measured.tolist(), dropout.tolist())
+    ]
+    stream = ("\n".join(lines) + "\n").encode()
+
+    truth = {
+        "sweep": np.full(len(index), job.sweep, dtype=np.int32),
+        "index": index.astype(np.int64),
+        "phi": phi_int.astype(np.int32),
+        "theta": theta_int.astype(np.int32),
+        "range": true_range,
+        "measured": measured,
+        "origin": origin,
+        "direction": direction,
+        "hit": origin + direction * true_range[:, None],
+        "dropout": dropout,
+        "spike": spike,
+    }
+    return stream, truth
+
+
+def make_jobs(sweeps: list[tuple[int, ...]], scene: dict, noise: Noise, chunk: int = CHUNK) -> list[Job]:
+    jobs = []
+    for sweep, parameters in enumerate(sweeps):
+        total = len(SweepGrid(*parameters))
+        for n, start in enumerate(range(0, total, chunk)):
+            jobs.append(Job(sweep, tuple(parameters), start, min(start + chunk, total), n, scene, noise))
+    return jobs
+
+
+def generate(jobs: list[Job], out: str, workers: int | None = None) -> int:
+    """Run `jobs` and write the stream and ground truth as chunks arrive.
+
+    Ground truth goes into one preallocated .npy memmap per field and is
+    packed into `<out>.npz` at the end, so memory does not grow with the run.
+    """
+    total = sum(job.stop - job.start for job in jobs)
+    tmpdir = tempfile.mkdtemp(prefix=".truth_", dir=os.path.dirname(os.path.abspath(out)))
+    try:
+        columns: dict[str, np.ndarray] = {}
+        samples = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor, open(f"{out}.txt", "wb") as stream:
+            for data, truth in executor.map(run_job, jobs):
+                stream.write(data)
+                n = len(truth["index"])
+                for key, value in truth.items():
+                    if key not in columns:
+                        columns[key] = np.lib.format.open_memmap(
+                            os.path.join(tmpdir, f"{key}.npy"), mode="w+", dtype=value.dtype,
+                            shape=(total,) + value.shape[1:],
+                        )
+                    columns[key][samples:samples + n] = value
+                samples += n
+
+        names = list(columns)
+        for column in columns.values():
+            column.flush()
+        del columns
+        # an .npz is a zip of .npy files; store them as np.savez does, streaming from disk
+        with zipfile.ZipFile(f"{out}.npz", "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for key in names:
+                archive.write(os.path.join(tmpdir, f"{key}.npy"), arcname=f"{key}.npy")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return samples
+
+
+def load_scene(path: str | None) -> dict:
+    if path is None:
+        return DEFAULT_SCENE
+    with open(path) as f:
+        scene = json.load(f)
+    if not scene.get("boxes"):
+        raise ValueError(f"{path}: scene needs a non-empty 'boxes' list")
+    return scene
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sweep", type=int, nargs=6, action="append", metavar=("A", "B", "C", "D", "E", "F"),
+                        help="SWEEP parameters as sent to the device; repeat for several sweeps")
+    parser.add_argument("--scene", help='JSON scene: {"boxes": [{"min": [x,y,z], "max": [x,y,z]}, ...], "max_range": n}')
+    parser.add_argument("--noise", type=float, default=0.0, help="gaussian range noise sigma")
+    parser.add_argument("--dropout", type=float, default=0.0, help="probability of a failed measurement")
+    parser.add_argument("--spikes", type=float, default=0.0, help="probability of a random range outlier")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument("--out", default="synthetic", help="output prefix for .txt stream and .npz ground truth")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    sweeps = args.sweep or [[0, REVOLUTION_STEPS - 1, 16, 0, REVOLUTION_STEPS - 1, 16]]
+    try:
+        scene = load_scene(args.scene)
+        jobs = make_jobs(sweeps, scene, Noise(args.noise, args.dropout, args.spikes, args.seed))
+    except (OSError, ValueError) as err:
+        print(err)
+        sys.exit(1)
+
+    started = time.monotonic()
+    samples = generate(jobs, args.out, args.workers)
+    elapsed = time.monotonic() - started
+    print(f"Wrote {samples} samples to {args.out}.txt / {args.out}.npz "
+          f"in {elapsed:.1f}s ({samples / elapsed * 60 / 1e6:.1f}M samples/min)")
+
+
+if __name__ == "__main__":
+    main()
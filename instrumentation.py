@@ -0,0 +1,164 @@
+import json
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+# upper bounds in seconds: 10 us .. ~42 s, doubling
+BUCKETS = tuple(1e-5 * 2 ** i for i in range(23))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus-style upper bounds)."""
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def observe_many(self, values):
+        if len(values) == 0:
+            return
+        idx = np.searchsorted(self.bounds, values, side="left")
+        for i, n in zip(*np.unique(idx, return_counts=True)):
+            self.counts[i] += int(n)
+        self.count += len(values)
+        self.sum += float(np.sum(values))
+        self.max = max(self.max, float(np.max(values)))
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile, capped at the max seen."""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "buckets": {str(b): n for b, n in zip(self.bounds, self.counts)},
+            "inf": self.counts[-1],
+        }
+
+
+class Instrumentation:
+    """Per-stage timing histograms and event counters.
+
+    Whole methods are timed by swapping a wrapper into the instance dict
+    (`instrument()`); disabling deletes the wrapper again, so a disabled
+    stage runs the original bound method with nothing in between. Code that
+    times sections inside a loop should test `enabled` once per iteration.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.monotonic()
+        self.histograms = {}
+        self.counters = {}
+        self.targets = []
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+        return hist
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def instrument(self, obj, method_name, stage):
+        self.targets.append((obj, method_name, stage))
+        if self.enabled:
+            self._install(obj, method_name, stage)
+
+    def _install(self, obj, method_name, stage):
+        method = getattr(type(obj), method_name).__get__(obj)
+        hist = self.histogram(stage)
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - t0)
+
+        setattr(obj, method_name, timed)
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        for obj, method_name, stage in self.targets:
+            if enabled:
+                self._install(obj, method_name, stage)
+            else:
+                obj.__dict__.pop(method_name, None)
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.histograms = {name: Histogram() for name in self.histograms}
+        self.counters = {name: 0 for name in self.counters}
+        if self.enabled:
+            # wrappers hold on to the old histogram objects
+            for obj, method_name, stage in self.targets:
+                self._install(obj, method_name, stage)
+
+    def summary(self):
+        """Human-readable table for the stats panel."""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        # columns are space-separated, so values wider than their column stay apart
+        lines = [f"{'stage':<22} {'n':>8} {'rate/s':>9} {'avg ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for name, hist in sorted(self.histograms.items()):
+            avg = hist.sum / hist.count if hist.count else 0.0
+            lines.append(
+                f"{name:<22} {hist.count:>8} {hist.count / elapsed:>9.1f} {avg * 1e3:>9.2f} "
+                f"{hist.quantile(0.5) * 1e3:>9.2f} {hist.quantile(0.99) * 1e3:>9.2f} {hist.max * 1e3:>9.2f}"
+            )
+        lines.append("")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<22} {value:>8} {value / elapsed:>9.1f}")
+        return "\n".join(lines)
+
+    def to_json(self):
+        return json.dumps({
+            "elapsed": time.monotonic() - self.started,
+            "histograms": {name: hist.to_dict() for name, hist in self.histograms.items()},
+            "counters": dict(self.counters),
+        }, indent=2)
+
+    def to_prometheus(self, prefix="lidar"):
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, hist in sorted(self.histograms.items()):
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(hist.bounds, hist.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+            lines.append(f"{metric}_sum {hist.sum}")
+            lines.append(f"{metric}_count {hist.count}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,167 @@
+import math
+import time
+
+import serial
+
+REVOLUTION_STEPS = 200
+BAUDRATE = 115200
+TIMEOUT = 1
+INT32_MIN, INT32_MAX = -(1 << 31), (1 << 31) - 1  # stepper positions are stored as int32
+
+
+class MathUtils:
+    @staticmethod
+    def clamp(val, min_val, max_val):
+        return min(max(val, min_val), max_val)
+
+    @staticmethod
+    def int_to_angle(val, steps=REVOLUTION_STEPS, min_angle=-math.pi, max_angle=math.pi):
+        val = ((val % REVOLUTION_STEPS) + REVOLUTION_STEPS) % REVOLUTION_STEPS
+        return min_angle + (max_angle - min_angle) * (val / steps)
+
+    @staticmethod
+    def spherical_to_cartesian(r, theta, phi):
+        x = r * math.sin(theta) * math.cos(phi)
+        y = r * math.sin(theta) * math.sin(phi)
+        z = r * math.cos(theta)
+        return x, y, z
+
+
+def parse_record(parts):
+    """Parse a split `R <phi> <theta> <dist>` line.
+
+    Returns (phi_int, theta_int, r) or None if the line is not a range record.
+    Raises ValueError if it is one but the fields are corrupted.
+    """
+    if len(parts) != 4 or parts[0] != "R":
+        return None
+    phi_int, theta_int, r = int(parts[1]), int(parts[2]), float(parts[3])
+    if not (INT32_MIN <= phi_int <= INT32_MAX and INT32_MIN <= theta_int <= INT32_MAX):
+        raise ValueError(f"Position out of range: {phi_int} {theta_int}")
+    return phi_int, theta_int, r
+
+
+def record_to_point(phi_int, theta_int, r):
+    phi = MathUtils.int_to_angle(phi_int)
+    theta = MathUtils.int_to_angle(theta_int)
+    return MathUtils.spherical_to_cartesian(r, theta, phi)
+
+
+class SweepGrid:
+    """The (phi, theta) visiting order of a SWEEP, as driven by the firmware.
+
+    Rows step phi from `a` towards `b` by `c`; within a row theta goes from
+    `d` up to the last `d + k*f <= e` and back down on odd rows (serpentine).
+    The grid index of a sample is its position in that order, which is what a
+    resumed SWEEP restarts from.
+    """
+
+    def __init__(self, a, b, c, d, e, f):
+        if c == 0 or f <= 0 or (b - a) * c < 0 or e < d:
+            raise ValueError(f"Degenerate sweep: {a} {b} {c} {d} {e} {f}")
+        self.a, self.b, self.c, self.d, self.e, self.f = a, b, c, d, e, f
+        self.rows = (b - a) // c + 1
+        self.cols = (e - d) // f + 1
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def position(self, index):
+        row, col = divmod(index, self.cols)
+        if row % 2:
+            col = self.cols - 1 - col
+        return self.a + row * self.c, self.d + col * self.f
+
+    def cell_of(self, x, y):
+        """(row, column) of a reported position, columns in increasing theta; None if off the grid."""
+        row, rem = divmod(x - self.a, self.c)
+        if rem or not 0 <= row < self.rows:
+            return None
+        col, rem = divmod(y - self.d, self.f)
+        if rem or not 0 <= col < self.cols:
+            return None
+        return row, col
+
+    def index_of(self, x, y):
+        """Grid index of a reported position, or None if it is not on the grid."""
+        cell = self.cell_of(x, y)
+        if cell is None:
+            return None
+        row, col = cell
+        if row % 2:
+            col = self.cols - 1 - col
+        return row * self.cols + col
+
+    def pairs(self, start=0):
+        for index in range(start, len(self)):
+            yield self.position(index)
+
+
+def sweep_command(parameters, start=0):
+    cmd = f"SWEEP {' '.join(str(p) for p in parameters)}"
+    if start:
+        cmd += f" {start}"
+    return cmd + "\n"
+
+
+class SweepProgress:
+    """Tracks how far a sweep got, so a dropped link can resume where it stopped.
+
+    Keeps one byte per grid cell: 0 not collected yet, 1 collected on an
+    earlier connection, 2 collected on the current one. Only cells from an
+    earlier connection count as duplicates, so samples arriving out of grid
+    order on a live link are never dropped. `next_index` is one past the
+    highest cell collected, i.e. where the device had got to: cells it
+    skipped (failed measurements, lost lines) are not swept again.
+    """
+
+    def __init__(self, parameters, next_index=0):
+        self.parameters = list(parameters)
+        self.grid = SweepGrid(*parameters)
+        self.collected = bytearray(len(self.grid))
+        self.collected[:next_index] = b"\x01" * min(next_index, len(self.grid))
+        self.next_index = next_index
+
+    @property
+    def complete(self):
+        return self.next_index >= len(self.grid)
+
+    def accept(self, phi_int, theta_int):
+        """Record a sample; False if its grid cell was collected before the link dropped.
+
+        Samples that are not on the grid (e.g. a device replaying a recording)
+        are passed through without affecting progress.
+        """
+        index = self.grid.index_of(phi_int, theta_int)
+        if index is None:
+            return True
+        if self.collected[index] == 1:
+            return False
+        self.collected[index] = 2
+        self.next_index = max(self.next_index, index + 1)
+        return True
+
+    def resume_command(self):
+        """SWEEP command for a new connection; everything collected so far becomes a duplicate."""
+        self.collected = self.collected.replace(b"\x02", b"\x01")
+        return sweep_command(self.parameters, self.next_index)
+
+
+def reconnect(port, stopped, log, first_delay=0.5, max_delay=30.0):
+    """Reopen `port` with exponential backoff until it works or `stopped()` is true."""
+    delay = first_delay
+    attempt = 1
+    while not stopped():
+        # sleep in slices so Stop is not ignored for up to max_delay
+        deadline = time.monotonic() + delay
+        while not stopped() and time.monotonic() < deadline:
+            time.sleep(max(min(0.1, deadline - time.monotonic()), 0.0))
+        if stopped():
+            break
+        try:
+            return serial.Serial(port, BAUDRATE, timeout=TIMEOUT)
+        except serial.SerialException as err:
+            log(f"Reconnect attempt {attempt} failed: {err}")
+        delay = min(delay * 2, max_delay)
+        attempt += 1
+    return None
@@ -0,0 +1,231 @@
+import numpy as np
+
+from protocol import SweepGrid
+
+EDGE_THRESHOLD = 0.05  # relative range jump treated as a depth discontinuity
+
+# change detection: a sample changed if it moved by more than CHANGE_K noise sigmas,
+# where sigma is at least CHANGE_SIGMA range units or CHANGE_RELATIVE of the range
+CHANGE_K = 3.0
+CHANGE_SIGMA = 1.0
+CHANGE_RELATIVE = 0.01
+CHANGE_ALPHA = 0.1  # weight of a new residual in the per-cell noise estimate
+
+
+class RangeImage:
+    """A sweep kept as an organized (phi row, theta column) image.
+
+    Cell (i, j) holds the sample taken at phi = a + i*c, theta = d + j*f, so
+    the neighbours of a sample are its neighbours in the image and every
+    operation below is a whole-array numpy expression. Missing samples are NaN.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.range = np.full((grid.rows, grid.cols), np.nan, dtype=np.float32)
+        self.points = np.full((grid.rows, grid.cols, 3), np.nan, dtype=np.float32)
+
+    @classmethod
+    def from_parameters(cls, parameters):
+        return cls(SweepGrid(*parameters))
+
+    @property
+    def shape(self):
+        return self.range.shape
+
+    def cells(self, phi, theta):
+        """Vectorized SweepGrid.cell_of: (rows, cols, on_grid mask)."""
+        phi = np.asarray(phi, dtype=np.int64) - self.grid.a
+        theta = np.asarray(theta, dtype=np.int64) - self.grid.d
+        rows, row_rem = np.divmod(phi, self.grid.c)
+        cols, col_rem = np.divmod(theta, self.grid.f)
+        on_grid = (
+            (row_rem == 0) & (col_rem == 0)
+            & (rows >= 0) & (rows < self.grid.rows)
+            & (cols >= 0) & (cols < self.grid.cols)
+        )
+        return rows, cols, on_grid
+
+    def update(self, phi_int, theta_int, r, point):
+        """Store one sample; returns its (row, col) or None if it is off the grid."""
+        cell = self.grid.cell_of(phi_int, theta_int)
+        if cell is not None:
+            self.range[cell] = r
+            self.points[cell] = point
+        return cell
+
+    def update_many(self, phi, theta, r, points):
+        rows, cols, on_grid = self.cells(phi, theta)
+        rows, cols = rows[on_grid], cols[on_grid]
+        self.range[rows, cols] = np.asarray(r)[on_grid]
+        self.points[rows, cols] = np.asarray(points)[on_grid]
+        return on_grid
+
+    def copy(self):
+        image = RangeImage(self.grid)
+        image.range[:] = self.range
+        image.points[:] = self.points
+        return image
+
+    def valid(self):
+        return ~np.isnan(self.range)
+
+    @staticmethod
+    def _pad(image):
+        pad = ((1, 1), (1, 1)) + ((0, 0),) * (image.ndim - 2)
+        return np.pad(image, pad, constant_values=np.nan)
+
+    def normals(self):
+        """Per-cell unit normals from central differences, facing the scanner.
+
+        Where one neighbour is missing (image border, next to a hole) the
+        one-sided difference to the other neighbour is used instead.
+        """
+        p = self._pad(self.points)
+        centre = self.points
+
+        def difference(prev, next_):
+            d = next_ - prev
+            d = np.where(np.isnan(d), next_ - centre, d)
+            return np.where(np.isnan(d), centre - prev, d)
+
+        du = difference(p[1:-1, :-2], p[1:-1, 2:])
+        dv = difference(p[:-2, 1:-1], p[2:, 1:-1])
+        n = np.cross(du, dv)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            n /= np.linalg.norm(n, axis=-1, keepdims=True)
+        n[~self.valid()] = np.nan
+        # the scanner sits at the origin: flip normals pointing away from it
+        away = np.sum(n * self.points, axis=-1) > 0
+        n[away] = -n[away]
+        return n
+
+    def edges(self, threshold=EDGE_THRESHOLD):
+        """Cells with a 4-neighbour whose range differs by more than `threshold` * range."""
+        r = self._pad(self.range)
+        centre = r[1:-1, 1:-1]
+        edge = np.zeros(self.shape, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for nb in (r[:-2, 1:-1], r[2:, 1:-1], r[1:-1, :-2], r[1:-1, 2:]):
+                edge |= np.abs(centre - nb) > threshold * centre
+        return edge
+
+    def fill_holes(self, iterations=1, min_neighbours=2):
+        """Copy with missing cells set to the mean of their valid 4-neighbours.
+
+        Each iteration grows fills inwards by one cell; cells with fewer than
+        `min_neighbours` valid neighbours stay empty.
+        """
+        filled = self.copy()
+
+        for _ in range(iterations):
+            holes = np.isnan(filled.range)
+            if not holes.any():
+                break
+            r = self._pad(filled.range)
+            p = self._pad(filled.points)
+            shifts = ((slice(None, -2), slice(1, -1)), (slice(2, None), slice(1, -1)),
+                      (slice(1, -1), slice(None, -2)), (slice(1, -1), slice(2, None)))
+            count = sum(~np.isnan(r[s]) for s in shifts)
+            fill = holes & (count >= min_neighbours)
+            if not fill.any():
+                break
+            with np.errstate(invalid="ignore"):
+                r_mean = np.nansum([r[s] for s in shifts], axis=0) / count
+                p_mean = np.nansum([p[s] for s in shifts], axis=0) / count[..., None]
+            filled.range[fill] = r_mean[fill]
+            filled.points[fill] = p_mean[fill]
+        return filled
+
+    def mesh(self, threshold=EDGE_THRESHOLD):
+        """Triangulate neighbouring cells, skipping triangles across depth jumps.
+
+        Returns (vertices, triangles) like Reconstructor.mesh(); vertex k is
+        the k-th valid cell in row-major order, so `normals()[valid()]` are
+        its vertex normals.
+        """
+        valid = self.valid()
+        ids = np.full(self.shape, -1, dtype=np.int32)
+        ids[valid] = np.arange(int(valid.sum()), dtype=np.int32)
+        vertices = self.points[valid].astype(np.float64)
+
+        v00, v01 = ids[:-1, :-1], ids[:-1, 1:]
+        v10, v11 = ids[1:, :-1], ids[1:, 1:]
+        r00, r01 = self.range[:-1, :-1], self.range[:-1, 1:]
+        r10, r11 = self.range[1:, :-1], self.range[1:, 1:]
+
+        triangles = []
+        for (a, ra), (b, rb), (c, rc) in (((v00, r00), (v10, r10), (v01, r01)),
+                                          ((v01, r01), (v10, r10), (v11, r11))):
+            lo = np.minimum(np.minimum(ra, rb), rc)
+            hi = np.maximum(np.maximum(ra, rb), rc)
+            with np.errstate(invalid="ignore"):
+                keep = (a >= 0) & (b >= 0) & (c >= 0) & (hi - lo <= threshold * lo)
+            triangles.append(np.stack((a[keep], b[keep], c[keep]), axis=1))
+        return vertices, np.vstack(triangles).astype(np.int32)
+
+    def depth_map(self):
+        """Range normalized to [0, 1] for display; missing cells stay NaN."""
+        if not self.valid().any():
+            return np.full(self.shape, np.nan, dtype=np.float32)
+        lo = np.nanmin(self.range)
+        hi = np.nanmax(self.range)
+        return (self.range - lo) / (hi - lo if hi > lo else 1.0)
+
+
+class ChangeDetector:
+    """Flags samples that differ from the previous sweep at the same grid cell.
+
+    The threshold of each cell is CHANGE_K times its noise sigma: the larger
+    of a fixed floor, a fraction of the reference range and a running estimate
+    learned from the residuals of samples that did not change. Cells without
+    a reference sample always count as changed; samples off the grid are
+    never filtered.
+    """
+
+    def __init__(self, reference, k=CHANGE_K, sigma=CHANGE_SIGMA, relative=CHANGE_RELATIVE, alpha=CHANGE_ALPHA,
+                 noise=None):
+        self.reference = reference
+        self.k = k
+        self.sigma = sigma
+        self.relative = relative
+        self.alpha = alpha
+        # mean absolute residual per cell; sigma ~ 1.25 * MAD for gaussian noise.
+        # Pass the previous detector's estimate to keep learning across sweeps.
+        self.noise = noise.copy() if noise is not None else np.zeros(reference.shape, dtype=np.float32)
+
+    def _threshold(self, ref, noise):
+        return self.k * np.maximum(np.maximum(self.sigma, self.relative * ref), 1.25 * noise)
+
+    def check(self, phi_int, theta_int, r):
+        """True if the sample must be forwarded."""
+        cell = self.reference.grid.cell_of(phi_int, theta_int)
+        if cell is None:
+            return True
+        ref = self.reference.range[cell]
+        if ref != ref:  # NaN: nothing to compare against
+            return True
+
+        residual = abs(r - ref)
+        changed = residual > self._threshold(ref, self.noise[cell])
+        if not changed:
+            self.noise[cell] += self.alpha * (residual - self.noise[cell])
+        return bool(changed)
+
+    def check_many(self, phi, theta, r):
+        """Vectorized check(); returns a mask of the samples to forward."""
+        rows, cols, on_grid = self.reference.cells(phi, theta)
+        forward = np.ones(len(on_grid), dtype=bool)
+        rows, cols = rows[on_grid], cols[on_grid]
+        r = np.asarray(r, dtype=np.float32)[on_grid]
+
+        ref = self.reference.range[rows, cols]
+        noise = self.noise[rows, cols]
+        residual = np.abs(r - ref)
+        with np.errstate(invalid="ignore"):
+            changed = np.isnan(ref) | (residual > self._threshold(ref, noise))
+
+        same = ~changed
+        self.noise[rows[same], cols[same]] = noise[same] + self.alpha * (residual[same] - noise[same])
+        forward[on_grid] = changed
+        return forward
@@ -0,0 +1,281 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import open3d as o3d
+
+TILE_SIZE = 250.0
+TILE_MARGIN = 25.0
+MIN_TILE_POINTS = 20
+
+
+def mesh_tile(points, bounds, method="poisson", depth=8, normals=None):
+    """Reconstruct a surface from `points` and keep the triangles inside `bounds`.
+
+    Runs in a worker process, so it only takes and returns plain arrays.
+    `points` may reach past `bounds` by a margin; triangles are assigned to
+    the tile holding their centroid, so neighbouring tiles do not overlap.
+    `normals` (e.g. from RangeImage.normals()) are used as given when every
+    point has one; otherwise they are estimated from a KD-tree.
+    """
+    if len(points) < MIN_TILE_POINTS:
+        return Reconstructor.empty_mesh()
+
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points)
+    spacing = float(np.mean(pcd.compute_nearest_neighbor_distance()))
+    if spacing <= 0:
+        return Reconstructor.empty_mesh()
+
+    if normals is not None and np.isfinite(normals).all():
+        pcd.normals = o3d.utility.Vector3dVector(normals)
+    else:
+        pcd.estimate_normals(o3d.geometry.KDTreeSearchParamHybrid(radius=spacing * 4, max_nn=30))
+        # every sample was seen from the scanner head at the origin
+        pcd.orient_normals_towards_camera_location(np.zeros(3))
+
+    if method == "poisson":
+        mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=depth)
+        densities = np.asarray(densities)
+        mesh.remove_vertices_by_mask(densities < np.quantile(densities, 0.05))
+    elif method == "ball_pivoting":
+        radii = o3d.utility.DoubleVector([spacing * 1.5, spacing * 3, spacing * 6])
+        mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_ball_pivoting(pcd, radii)
+    else:
+        raise ValueError(f"Unknown reconstruction method: {method}")
+
+    vertices = np.asarray(mesh.vertices)
+    triangles = np.asarray(mesh.triangles)
+    if len(triangles) == 0:
+        return Reconstructor.empty_mesh()
+
+    lo, hi = bounds
+    centroids = vertices[triangles].mean(axis=1)
+    inside = np.all((centroids >= lo) & (centroids < hi), axis=1)
+    triangles = triangles[inside]
+
+    used, triangles = np.unique(triangles, return_inverse=True)
+    return vertices[used], triangles.reshape(-1, 3).astype(np.int32)
+
+
+class Reconstructor:
+    """Incremental surface reconstruction on a process pool.
+
+    Space is cut into cubic tiles of `tile_size`. Each `submit()` takes a
+    snapshot of the point store, and only tiles whose content changed since
+    the last snapshot are re-meshed. A tile that changes again while its job
+    is queued or running gets its old job cancelled, or its result dropped if
+    it is too late to cancel. Call `poll()` regularly to collect results.
+
+    If a worker dies (e.g. Open3D crashing on a degenerate tile) the pool is
+    replaced and the affected tiles are retried with the next snapshot.
+    """
+
+    def __init__(self, method="poisson", depth=8, tile_size=TILE_SIZE, margin=TILE_MARGIN, max_workers=None,
+                 log=None):
+        self.method = method
+        self.depth = depth
+        if not 0 <= margin < tile_size:
+            raise ValueError("margin must be smaller than tile_size")
+        self.tile_size = tile_size
+        self.margin = margin
+        self.max_workers = max_workers
+        self.log = log or (lambda msg: None)
+        self.executor = self._make_executor()
+
+        self.signatures = {}  # tile -> (count, coordinate sum) of the last submitted snapshot
+        self.pending = {}     # tile -> (generation, future)
+        self.generation = {}  # tile -> latest submitted generation
+        self.tiles = {}       # tile -> (vertices, triangles)
+
+    def _make_executor(self):
+        # the GUI process owns a GL context; don't fork it into the workers
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _restart(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._make_executor()
+        self.log("A reconstruction worker died; restarted the process pool.")
+
+    @staticmethod
+    def empty_mesh():
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int32)
+
+    def _tile_keys(self, points):
+        return np.floor(points / self.tile_size).astype(np.int64)
+
+    def submit(self, points, normals=None):
+        """Queue re-meshing of every tile that changed; returns how many were queued.
+
+        `normals` optionally gives a normal per point (NaN where unknown).
+        """
+        if len(points) == 0:
+            return 0
+
+        # runs on the GUI thread, so no per-tile scans of the whole snapshot:
+        # sort once by tile, then every tile is a slice
+        keys = self._tile_keys(points)
+        origin = keys.min(axis=0) - 1
+        span = keys.max(axis=0) - origin + 2  # one spare tile on each side for the margins
+        linear = np.ravel_multi_index((keys - origin).T, span)
+        order = np.argsort(linear)
+        starts = np.flatnonzero(np.r_[True, np.diff(linear[order]) != 0])
+        counts = np.diff(np.r_[starts, len(order)])
+        sums = np.add.reduceat(points[order], starts, axis=0)
+        tile_linear = linear[order[starts]]
+        unique = np.stack(np.unravel_index(tile_linear, span), axis=1) + origin
+
+        changed = []
+        for i, key in enumerate(map(tuple, unique.tolist())):
+            signature = (int(counts[i]), tuple(np.round(sums[i], 3)))
+            if self.signatures.get(key) != signature:
+                self.signatures[key] = signature
+                changed.append(key)
+
+        for key in set(self.signatures) - set(map(tuple, unique.tolist())):
+            # tile emptied out (e.g. the store was cleared)
+            del self.signatures[key]
+            self._cancel(key)
+            self.tiles.pop(key, None)
+
+        if not changed:
+            return 0
+        wanted = np.ravel_multi_index((np.array(changed) - origin).T, span)
+        slices = self._margin_slices(points, normals, keys, linear, span, wanted)
+
+        for key, target in zip(changed, wanted.tolist()):
+            lo = np.array(key, dtype=float) * self.tile_size
+            hi = lo + self.tile_size
+            near, near_normals = slices[target]
+
+            self._cancel(key)
+            generation = self.generation.get(key, 0) + 1
+            self.generation[key] = generation
+            args = (mesh_tile, near, (lo, hi), self.method, self.depth, near_normals)
+            try:
+                future = self.executor.submit(*args)
+            except BrokenProcessPool:
+                self._restart()
+                future = self.executor.submit(*args)
+            self.pending[key] = (generation, future)
+
+        return len(changed)
+
+    def _margin_slices(self, points, normals, keys, linear, span, wanted):
+        """(points, normals) of the `wanted` tiles including their margins, by linear tile index.
+
+        A point within `margin` of a face of its tile also belongs to the
+        neighbour across that face, so each point is listed once per tile it
+        reaches and a single sort groups them all.
+        """
+        offset = points - keys * self.tile_size
+        low = offset < self.margin
+        high = offset >= self.tile_size - self.margin
+        strides = np.array([span[1] * span[2], span[2], 1])
+
+        indices = []
+        targets = []
+        for step in np.ndindex(3, 3, 3):
+            step = np.array(step) - 1
+            reach = np.ones(len(points), dtype=bool)
+            for axis in range(3):
+                if step[axis] < 0:
+                    reach &= low[:, axis]
+                elif step[axis] > 0:
+                    reach &= high[:, axis]
+            index = np.flatnonzero(reach)
+            target = linear[index] + int(step @ strides)
+            keep = np.isin(target, wanted)
+            indices.append(index[keep])
+            targets.append(target[keep])
+
+        indices = np.concatenate(indices)
+        targets = np.concatenate(targets)
+        order = np.argsort(targets)
+        targets = targets[order]
+        grouped = points[indices[order]]
+        grouped_normals = normals[indices[order]] if normals is not None else None
+        starts = np.flatnonzero(np.r_[True, np.diff(targets) != 0])
+        stops = np.r_[starts[1:], len(targets)]
+        return {
+            t: (grouped[a:b], grouped_normals[a:b] if normals is not None else None)
+            for t, a, b in zip(targets[starts].tolist(), starts.tolist(), stops.tolist())
+        }
+
+    def _cancel(self, key):
+        job = self.pending.pop(key, None)
+        if job is not None:
+            job[1].cancel()
+
+    def poll(self):
+        """Collect finished tiles; returns True if the merged mesh changed."""
+        updated = False
+        for key, (generation, future) in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[key]
+            if future.cancelled() or generation != self.generation.get(key):
+                continue
+            if future.exception() is not None:
+                # keep the previous mesh of this tile; the next change retries it
+                self.signatures.pop(key, None)
+                continue
+            self.tiles[key] = future.result()
+            updated = True
+        return updated
+
+    def clear(self):
+        for key in list(self.pending):
+            self._cancel(key)
+        self.signatures.clear()
+        self.generation.clear()
+        self.tiles.clear()
+
+    def mesh(self):
+        """Merge the tile meshes into one (vertices, triangles) pair."""
+        vertices = []
+        triangles = []
+        offset = 0
+        for tile_vertices, tile_triangles in self.tiles.values():
+            if len(tile_triangles) == 0:
+                continue
+            vertices.append(tile_vertices)
+            triangles.append(tile_triangles + offset)
+            offset += len(tile_vertices)
+        if not vertices:
+            return Reconstructor.empty_mesh()
+        return np.vstack(vertices), np.vstack(triangles)
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def save_mesh_ply(filename, vertices, triangles, normals=None):
+    with open(filename, "w") as f:
+        f.write("ply\n")
+        f.write("format ascii 1.0\n")
+        f.write(f"element vertex {len(vertices)}\n")
+        f.write("property float x\n")
+        f.write("property float y\n")
+        f.write("property float z\n")
+        if normals is not None:
+            f.write("property float nx\n")
+            f.write("property float ny\n")
+            f.write("property float nz\n")
+        f.write(f"element face {len(triangles)}\n")
+        f.write("property list uchar int vertex_indices\n")
+        f.write("end_header\n")
+
+        if normals is None:
+            for x, y, z in vertices:
+                f.write(f"{x} {y} {z}\n")
+        else:
+            for (x, y, z), (nx, ny, nz) in zip(vertices, normals):
+                f.write(f"{x} {y} {z} {nx} {ny} {nz}\n")
+        for a, b, c in triangles:
+            f.write(f"3 {a} {b} {c}\n")
@@ -12,8 +12,9 @@ import numpy as np
 from pytransform3d.plot_utils import make_3d_axis, plot_vector
 from pytransform3d.rotations import matrix_from_axis_angle
 
+from protocol import SweepGrid
+
 if TYPE_CHECKING:
-    from collections.abc import Generator
     from mpl_toolkits.mplot3d.axes3d import Axes3D
 
 REVOLUTION_STEPS = 4096
@@ -62,20 +63,6 @@ def draw_arm(ax: Axes3D, phi: float, theta: float) -> None:
     ax.legend()
 
 
-def sweep_pairs(a: int, b: int, c: int, d: int, e: int, f: int) -> Generator[tuple[int, int]]:
-    i = 0
-    pos = c > 0
-    while True:
-        x = a + i * c
-        if x > b if pos else x < b:
-            break
-        if i % 2 == 0:
-            yield from ((x, y) for y in range(d, e + 1, f))
-        else:
-            yield from ((x, y) for y in range(e, d - 1, -f))
-        i += 1
-
-
 def ray_intersect_cube(ray_origin: np.ndarray, ray_dir: np.ndarray, cube_min: np.ndarray, cube_max: np.ndarray) -> np.ndarray | None:
     dir_fraction = np.empty(3)
     dir_fraction[ray_dir != 0] = 1.0 / ray_dir[ray_dir != 0]
@@ -113,6 +100,16 @@ def raycast(v: np.ndarray, dir_: np.ndarray) -> int:
     return int(min(room_distance, table_distance, 1023.0))
 
 
+def load_recording(path: Path) -> dict[tuple[int, int], int]:
+    """Distances of a recorded scan (`R <phi> <theta> <dist>` lines) by position."""
+    recorded = {}
+    for line in path.open():
+        parts = line.split()
+        if len(parts) == 4 and parts[0] == "R":
+            recorded[int(parts[1]), int(parts[2])] = int(parts[3])
+    return recorded
+
+
 class WorkerThread(threading.Thread):
     def __init__(self, data_ready: threading.Event, data_ack: threading.Event, port: str) -> None:
         super().__init__()
@@ -132,37 +129,43 @@ class WorkerThread(threading.Thread):
                     if not line:
                         break
                     parts = line.decode("852").strip().split()
-                    if len(parts) != 7 or parts[0] != "SWEEP":
+                    if len(parts) not in (7, 8) or parts[0] != "SWEEP":
                         continue
                     parts = parts[1:]
                     try:
-                        a, b, c, d, e, f = map(int, parts)
+                        a, b, c, d, e, f = map(int, parts[:6])
+                        # optional 7th argument: grid index to resume a sweep from
+                        start = int(parts[6]) if len(parts) == 7 else 0
                         if (
                             not all(0 <= v <= REVOLUTION_STEPS - 1 for v in (a, b, d, e, f))
                             or not -REVOLUTION_STEPS + 1 <= c <= REVOLUTION_STEPS
                         ):
                             raise ValueError
+                        grid = SweepGrid(a, b, c, d, e, f)
+                        if not 0 <= start <= len(grid):
+                            raise ValueError
                     except ValueError:
                         port.write(b"\nI\n")
                         continue
-                    data = Path("skan.txt").open().readlines()
-                    for line in data:
-                        time.sleep(0.05)
-                        port.write(line.encode())
-                        port.flush()
-                    port.flush()
-                    continue
-                    for phi_int, theta_int in sweep_pairs(a, b, c, d, e, f):
+                    # replay in grid order so a resumed sweep continues at the grid index the
+                    # client sent; cells the recording lacks are raycast with the arm model
+                    recorded = load_recording(Path("skan.txt"))
+                    for phi_int, theta_int in grid.pairs(start):
                         phi = int_to_angle(phi_int)
                         theta = int_to_angle(theta_int)
-                        _, _, _, _, _, pC, Dr = get_arm_positions(phi, theta)
-                        length = raycast(pC, Dr)
+                        if (phi_int, theta_int) in recorded:
+                            time.sleep(0.05)
+                            length = recorded[phi_int, theta_int]
+                        else:
+                            _, _, _, _, _, pC, Dr = get_arm_positions(phi, theta)
+                            length = raycast(pC, Dr)
                         port.write(f"\nR {phi_int} {theta_int} {length}\n".encode())
                         # port.write(f"y+")
                         self.latest = (phi, theta)
                         self.data_ready.set()
                         self.data_ack.wait()
                         self.data_ack.clear()
+                    port.flush()
                 except KeyboardInterrupt:
                     self.running = False
                     break
@@ -1,11 +1,26 @@
 #!/usr/bin/env python3
 import os
+import sys
 import time
 import math
 import random
+import select
+import argparse
+
+from protocol import REVOLUTION_STEPS
+
+BATCH = 1024          # records queued per refill of the output buffer
+READ_SIZE = 4096
+MAX_BURST = 0.05      # seconds of rate-limited output allowed to pile up
+
+HELP = """Commands:
+  ?        one random point
+  b / B    next dataset point
+  N <n>    stream the next n dataset points as fast as possible
+  C <rate> stream dataset points continuously at <rate> points/s (0 = unlimited)
+  X        stop streaming
+  q / Q    quit"""
 
-device = "/dev/pts/5"
-ply_file = "bunny.ply"
 
 def load_points(filename, step=10):
     points = []
@@ -28,40 +43,201 @@ def load_points(filename, step=10):
         points.append((r, theta, phi))
     return points
 
-points = load_points(ply_file)
-print(f"Loaded {len(points)} points from {ply_file}")
 
-print(f"Opening {device} for read/write...")
+def angle_to_int(angle):
+    # inverse of MathUtils.int_to_angle
+    return round((angle + math.pi) / (2 * math.pi) * REVOLUTION_STEPS) % REVOLUTION_STEPS
 
-with open(device, "r+b", buffering=0) as port:
-    print("Listening... ('?' = random point, 'b'/'B' = bunny point, 'q'/'Q' = quit)")
-    index = 0
 
-    while True:
-        data = port.read(1)
-        if not data:
-            time.sleep(0.001)
-            continue
+def encode_point(r, theta, phi, fmt):
+    if fmt == "wire":
+        return f"R {angle_to_int(phi)} {angle_to_int(theta)} {r:.2f}\n".encode()
+    return f"{r:.2f},{theta:.6f},{phi:.6f}\n".encode()
+
+
+class Dataset:
+    """All points pre-encoded into one blob, so a run of records is one slice."""
+
+    def __init__(self, points, fmt):
+        records = [encode_point(r, theta, phi, fmt) for r, theta, phi in points]
+        self.blob = memoryview(b"".join(records))
+        self.offsets = [0]
+        for record in records:
+            self.offsets.append(self.offsets[-1] + len(record))
+        self.count = len(records)
+
+    def take(self, index, n):
+        """Return (chunks, next_index) covering n records from index, wrapping around."""
+        chunks = []
+        while n > 0:
+            end = min(index + n, self.count)
+            chunks.append(self.blob[self.offsets[index]:self.offsets[end]])
+            n -= end - index
+            index = end % self.count
+        return chunks, index
+
+
+class Simulator:
+    def __init__(self, fd, dataset, fmt, verbose=True):
+        self.fd = fd
+        self.dataset = dataset
+        self.fmt = fmt
+        self.verbose = verbose
+        self.index = 0
+        self.inbuf = b""
+        self.outbuf = bytearray()
+        self.remaining = 0      # points left of an `N` request
+        self.rate = None        # points/s of a `C` stream, 0 = unlimited
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+        self.sent = 0
+        self.running = True
+
+    def send_one(self, record):
+        self.outbuf += record
+
+    def handle_input(self):
+        while self.inbuf:
+            c = self.inbuf[:1]
+            if c in (b"N", b"C"):
+                end = self.inbuf.find(b"\n")
+                if end < 0:
+                    return  # wait for the rest of the line
+                line, self.inbuf = self.inbuf[:end], self.inbuf[end + 1:]
+                self.handle_stream_command(line.decode(errors="ignore").split())
+                continue
+
+            self.inbuf = self.inbuf[1:]
+            if c == b"?":
+                r = random.uniform(0, 1000)
+                theta = random.uniform(0, math.pi)
+                phi = random.uniform(0, 2 * math.pi)
+                self.send_one(encode_point(r, theta, phi, self.fmt))
+                if self.verbose:
+                    print(f"Sent random point: r={r:.2f}, theta={theta:.6f}, phi={phi:.6f}")
+            elif c in (b"b", b"B"):
+                index = self.index
+                chunks, self.index = self.dataset.take(index, 1)
+                self.send_one(chunks[0])
+                if self.verbose:
+                    print(f"Sent dataset point {index}")
+            elif c == b"X":
+                self.remaining = 0
+                self.rate = None
+                print(f"Stream stopped ({self.sent} points sent).")
+            elif c in (b"q", b"Q"):
+                print("Received 'q' -> exiting.")
+                self.running = False
+                return
+
+    def handle_stream_command(self, parts):
+        try:
+            value = float(parts[1])
+            if value < 0:
+                raise ValueError
+        except (IndexError, ValueError):
+            print(f"Bad stream command: {' '.join(parts)}")
+            return
+
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+        if parts[0] == "N":
+            self.remaining = int(value)
+            self.rate = None
+            print(f"Streaming {self.remaining} points.")
+        else:
+            self.remaining = 0
+            self.rate = value
+            print(f"Streaming continuously at {value:g} points/s." if value else "Streaming continuously, unthrottled.")
+
+    def refill(self):
+        """Top up the output buffer from the active stream, honouring the rate limit."""
+        if len(self.outbuf) >= READ_SIZE * 4:
+            return
+
+        if self.remaining > 0:
+            n = min(self.remaining, BATCH)
+            self.remaining -= n
+        elif self.rate:
+            now = time.monotonic()
+            self.tokens = min(self.tokens + (now - self.last_refill) * self.rate, max(self.rate * MAX_BURST, 1.0))
+            self.last_refill = now
+            n = min(int(self.tokens), BATCH)
+            self.tokens -= n
+        elif self.rate == 0:
+            n = BATCH
+        else:
+            return
+
+        if n:
+            chunks, self.index = self.dataset.take(self.index, n)
+            for chunk in chunks:
+                self.outbuf += chunk
+            self.sent += n
+
+    def poll_timeout(self):
+        """Milliseconds until there may be something to write, None to block on input."""
+        if self.outbuf or self.remaining > 0 or self.rate == 0:
+            return None  # POLLOUT wakes us
+        if self.rate:
+            return max(1000.0 * (1.0 - self.tokens) / self.rate, 1.0)
+        return None
+
+    def run(self):
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+
+        while self.running:
+            self.refill()
+            want_write = bool(self.outbuf) or self.remaining > 0 or self.rate == 0
+            poller.modify(self.fd, select.POLLIN | (select.POLLOUT if want_write else 0))
+
+            for _, event in poller.poll(self.poll_timeout()):
+                if event & select.POLLIN:
+                    data = os.read(self.fd, READ_SIZE)
+                    if data:
+                        self.inbuf += data
+                        self.handle_input()
+                if event & select.POLLOUT and self.outbuf:
+                    try:
+                        written = os.write(self.fd, self.outbuf)
+                    except BlockingIOError:
+                        written = 0
+                    del self.outbuf[:written]
+                if event & (select.POLLHUP | select.POLLERR) and not event & select.POLLIN:
+                    # the other end of the pty is not open yet (or went away)
+                    time.sleep(0.05)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Serial LIDAR simulator", epilog=HELP,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("device", help="pty to serve, e.g. one end of start_socat.sh")
+    parser.add_argument("--dataset", default="bunny.ply", help="ASCII PLY with x y z vertices")
+    parser.add_argument("--step", type=int, default=10, help="keep every n-th dataset point")
+    parser.add_argument("--format", choices=("csv", "wire"), default="csv",
+                        help="csv: 'r,theta,phi'; wire: client 'R <phi> <theta> <dist>' records")
+    parser.add_argument("--quiet", action="store_true", help="don't print single-point replies")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    points = load_points(args.dataset, step=args.step)
+    print(f"Loaded {len(points)} points from {args.dataset}")
+    if not points:
+        sys.exit(1)
+    dataset = Dataset(points, args.format)
+
+    print(f"Opening {args.device} for read/write...")
+    fd = os.open(args.device, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        print(HELP)
+        Simulator(fd, dataset, args.format, verbose=not args.quiet).run()
+    finally:
+        os.close(fd)
+
 
-        if data == b'?':
-            r = random.uniform(0, 1000)
-            theta = random.uniform(0, math.pi)
-            phi = random.uniform(0, 2 * math.pi)
-            msg = f"{r:.2f},{theta:.6f},{phi:.6f}\n".encode()
-            port.write(msg)
-            port.flush()
-            print(f"Sent random point: r={r:.2f}, theta={theta:.6f}, phi={phi:.6f}")
-
-        elif data in (b'b', b'B'):
-            if index >= len(points):
-                index = 0
-            r, theta, phi = points[index]
-            msg = f"{r:.2f},{theta:.6f},{phi:.6f}\n".encode()
-            port.write(msg)
-            port.flush()
-            print(f"Sent bunny point {index}: r={r:.2f}, theta={theta:.6f}, phi={phi:.6f}")
-            index += 1
-
-        elif data in (b'q', b'Q'):
-            print("Received 'q' -> exiting.")
-            break
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Headless z-buffered point-splat renderer in plain NumPy.
+
+Needs no GL context, so it works on capture nodes without a display and
+inside worker processes. Run as a script to render thumbnails of saved
+scans (ASCII PLY files or the sweeps of a session archive).
+"""
+import os
+import sys
+import math
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BACKGROUND = (255, 255, 255)
+
+
+class Camera:
+    """Orbit camera around `target`; z is up, angles in degrees."""
+
+    def __init__(self, width=700, height=650, target=(0.0, 0.0, 0.0), distance=2000.0,
+                 azimuth=-60.0, elevation=30.0, fov=60.0):
+        self.width = width
+        self.height = height
+        self.target = np.asarray(target, dtype=float)
+        self.distance = distance
+        self.azimuth = azimuth
+        self.elevation = elevation
+        self.fov = fov
+
+    @classmethod
+    def fit(cls, points, width=700, height=650, **kwargs):
+        """Camera framing the bounding sphere of `points`."""
+        camera = cls(width, height, **kwargs)
+        if len(points):
+            lo = points.min(axis=0)
+            hi = points.max(axis=0)
+            camera.target = (lo + hi) / 2
+            radius = max(float(np.linalg.norm(hi - lo)) / 2, 1e-6)
+            camera.distance = radius / math.sin(math.radians(camera.fov) / 2) * 1.05
+        return camera
+
+    def rotate(self, d_azimuth, d_elevation):
+        self.azimuth = (self.azimuth + d_azimuth) % 360
+        self.elevation = min(max(self.elevation + d_elevation, -89.0), 89.0)
+
+    def zoom(self, factor):
+        self.distance = max(self.distance * factor, 1e-6)
+
+    def basis(self):
+        """Eye position and the (right, up, forward) rows of the view rotation."""
+        az = math.radians(self.azimuth)
+        el = math.radians(self.elevation)
+        offset = np.array([math.cos(el) * math.cos(az), math.cos(el) * math.sin(az), math.sin(el)])
+        eye = self.target + self.distance * offset
+        forward = -offset
+        right = np.cross(forward, (0.0, 0.0, 1.0))
+        right /= np.linalg.norm(right)
+        up = np.cross(right, forward)
+        return eye, np.stack((right, up, forward))
+
+    def focal(self):
+        return (self.height / 2) / math.tan(math.radians(self.fov) / 2)
+
+
+def jet(values):
+    """The matplotlib 'jet' colormap as uint8 RGB, for values in [0, 1]."""
+    v = np.clip(np.asarray(values, dtype=np.float32), 0.0, 1.0)[:, None]
+    rgb = np.clip(1.5 - np.abs(4 * v - np.array([3.0, 2.0, 1.0], dtype=np.float32)), 0.0, 1.0)
+    return (rgb * 255).astype(np.uint8)
+
+
+def height_colors(points):
+    z = points[:, 2]
+    z_range = float(z.max() - z.min()) if len(z) else 0.0
+    return jet((z - z.min()) / (z_range or 1.0)) if len(z) else np.empty((0, 3), dtype=np.uint8)
+
+
+def _disk(radius):
+    r = int(math.ceil(radius))
+    dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+    inside = dx * dx + dy * dy <= radius * radius
+    return dx[inside], dy[inside]
+
+
+def render(points, camera, colors=None, point_size=2.0, background=BACKGROUND):
+    """Render `points` (n, 3) to a (height, width, 3) uint8 image.
+
+    Every point is splatted as a disk of `point_size` pixels diameter; the
+    nearest splat wins each pixel. `colors` is (n, 3) uint8, defaulting to
+    the same z colouring as EmbeddedOpen3D.
+    """
+    width, height = camera.width, camera.height
+    image = np.empty((height * width, 3), dtype=np.uint8)
+    image[:] = background
+    points = np.asarray(points, dtype=np.float32)
+    if len(points) == 0:
+        return image.reshape(height, width, 3)
+    if colors is None:
+        colors = height_colors(points)
+
+    eye, rotation = camera.basis()
+    cam = (points - eye.astype(np.float32)) @ rotation.T.astype(np.float32)
+    depth = cam[:, 2]
+    focal = camera.focal()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = focal / depth
+        u = width / 2 + cam[:, 0] * scale
+        v = height / 2 - cam[:, 1] * scale
+
+    visible = np.flatnonzero(
+        (depth > 1e-6 * camera.distance) & (u >= 0) & (u < width) & (v >= 0) & (v < height)
+    )
+    if len(visible) == 0:
+        return image.reshape(height, width, 3)
+    pix = v[visible].astype(np.int32) * width + u[visible].astype(np.int32)
+    depth = depth[visible]
+
+    # one pixel per point: nearest depth per pixel, then the points that own it
+    zbuf = np.full(height * width, np.inf, dtype=np.float32)
+    np.minimum.at(zbuf, pix, depth)
+    nearest = depth == zbuf[pix]
+    image[pix[nearest]] = colors[visible[nearest]]
+
+    if point_size > 1.0:
+        image, _ = _dilate(image.reshape(height, width, 3), zbuf.reshape(height, width), point_size / 2)
+    return image.reshape(height, width, 3)
+
+
+def _dilate(image, zbuf, radius):
+    """Grow every pixel into a disk, nearest depth winning (cost independent of point count)."""
+    out_image = image.copy()
+    out_z = zbuf.copy()
+    height, width = zbuf.shape
+    for dx, dy in zip(*_disk(radius)):
+        if dx == 0 and dy == 0:
+            continue
+        # source window shifted by (dx, dy) onto the destination window
+        dst = (slice(max(dy, 0), height + min(dy, 0)), slice(max(dx, 0), width + min(dx, 0)))
+        src = (slice(max(-dy, 0), height + min(-dy, 0)), slice(max(-dx, 0), width + min(-dx, 0)))
+        closer = zbuf[src] < out_z[dst]
+        out_z[dst][closer] = zbuf[src][closer]
+        out_image[dst][closer] = image[src][closer]
+    return out_image, out_z
+
+
+def load_ply_points(filename):
+    """x y z of an ASCII PLY (what LidarApp.save_ply writes)."""
+    with open(filename) as f:
+        header = 0
+        vertices = None
+        for line in f:
+            header += 1
+            parts = line.split()
+            if parts[:2] == ["element", "vertex"]:
+                vertices = int(parts[2])
+            if line.strip() == "end_header":
+                break
+    return np.loadtxt(filename, skiprows=header, max_rows=vertices, usecols=(0, 1, 2), ndmin=2)
+
+
+def save_image(filename, image):
+    from PIL import Image
+    Image.fromarray(image).save(filename)
+
+
+def render_thumbnail(job):
+    """Worker: (source, output path, size, archive sweep id or None) -> output path."""
+    source, out, size, sweep_id = job
+    if sweep_id is None:
+        points = load_ply_points(source)
+    else:
+        from archive import SessionArchive
+        columns = SessionArchive(source).load(sweep_id, columns=["x", "y", "z"])
+        points = np.column_stack((columns["x"], columns["y"], columns["z"]))
+    camera = Camera.fit(points, size, size)
+    save_image(out, render(points, camera, point_size=max(size / 256, 1.0)))
+    return out
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="ASCII PLY files or session archive directories")
+    parser.add_argument("--out-dir", default="thumbnails")
+    parser.add_argument("--size", type=int, default=256, help="thumbnail width and height in pixels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    jobs = []
+    for source in args.sources:
+        name = os.path.basename(os.path.normpath(source))
+        if os.path.isdir(source):
+            from archive import INDEX_FILE, SessionArchive
+            # SessionArchive() would initialise an empty archive here
+            if not os.path.exists(os.path.join(source, INDEX_FILE)):
+                print(f"Skipping {source}: not a session archive (no {INDEX_FILE})")
+                continue
+            for meta in SessionArchive(source).sweeps():
+                out = os.path.join(args.out_dir, f"{name}_sweep_{meta['id']:04d}.png")
+                jobs.append((source, out, args.size, meta["id"]))
+        else:
+            out = os.path.join(args.out_dir, os.path.splitext(name)[0] + ".png")
+            jobs.append((source, out, args.size, None))
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for out in executor.map(render_thumbnail, jobs):
+            print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
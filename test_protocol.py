@@ -0,0 +1,46 @@
+from protocol import SweepProgress
+
+PARAMETERS = [0, 9, 1, 0, 9, 1]  # 10 x 10 grid
+
+
+def collect(progress, indices):
+    return [progress.accept(*progress.grid.position(i)) for i in indices]
+
+
+def test_resume_skips_gaps():
+    progress = SweepProgress(PARAMETERS)
+    progress.resume_command()
+    collect(progress, [i for i in range(50) if i != 3])
+    assert progress.next_index == 50
+    assert progress.resume_command() == "SWEEP 0 9 1 0 9 1 50\n"
+
+
+def test_out_of_order_samples_are_kept_on_a_live_link():
+    progress = SweepProgress(PARAMETERS)
+    progress.resume_command()
+    assert collect(progress, [5, 2, 7, 2]) == [True, True, True, True]
+    assert progress.next_index == 8
+
+
+def test_cells_from_an_earlier_connection_are_duplicates():
+    progress = SweepProgress(PARAMETERS)
+    progress.resume_command()
+    collect(progress, [0, 1, 2, 4])
+    progress.resume_command()
+    # the gap at 3 is still welcome, everything else was already collected
+    assert collect(progress, [2, 3, 4, 5]) == [False, True, False, True]
+    assert progress.next_index == 6
+
+
+def test_off_grid_samples_pass_through():
+    progress = SweepProgress(PARAMETERS)
+    progress.resume_command()
+    assert progress.accept(-5, 100)
+    assert progress.next_index == 0
+
+
+def test_complete():
+    progress = SweepProgress(PARAMETERS)
+    progress.resume_command()
+    collect(progress, [99])
+    assert progress.complete